@@ -1,299 +1,1189 @@
+import os
+import time
 import numpy as np
 import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from vispy.color import Color
 from vispy import scene
 from vispy import geometry
+from vispy.visuals.transforms import MatrixTransform, ChainTransform
 
-from helpers.obj_loader import OBJLoader
-from canvas.canvas_visuals import SceneVisuals
+from helpers.obj_loader import OBJArrayLoader
+from helpers.decimation import decimate_mesh, mesh_edges
+from helpers.bvh import BVH
+from helpers.bounds import Bounds
+from helpers.mesh_cache import file_content_hash
+from helpers.normals import smooth_normals, NORMALS_WEIGHTINGS
+from canvas.canvas_visuals import SceneVisuals, WireframeFilter, PersistentMeshNode, UPLOAD_COUNTER
 from interaction.keys import KeyClass
 
+MESH_DATA_VERSION = 3  # increase it when the output of SceneObjects._read_obj is changed, old cached meshes will be ignored
+TRANSFORM_CHUNK_SIZE = 1 << 20  # the number of rows transformed at once by transform_values
+CHUNK_TRIANGLES = 250000  # large meshes are splitted into spatial chunks with at most this number of triangles, invisible chunks are not drawn
+LOD_RATIOS = (0.5, 0.1, 0.01)  # the part of triangles in each level of detail
+LOD_MIN_TRIANGLES = 100000  # levels of detail are not build for smaller meshes and levels
+LOD_TRIANGLES_PER_PIXEL = 0.5  # select the coarsest level with at least this number of triangles per pixel of projected bounds
+MERGE_MAX_TRIANGLES = 50000  # smaller objects with the same render settings can be merged into shared buffers
+MATERIAL_SETTINGS = ("show_faces", "poly_color", "shiness", "ambient_color", "show_edges", "shader_wireframe", "edge_color", "line_width", "show_points", "point_color", "point_size")  # objects are merged only if these settings are equal
 
-class SceneObjects(object):
-    def __init__(self, parent_view=None, render_settings=None, orientation=2, scale=1.0, is_centering=True):
-        self._meshes = []
-        self._view = parent_view
-        self._scene = parent_view.scene
-        # the set of render settings
-        # set it default values
-        self._settings_color = Color((0.8, 0.8, 0.8, 1.0))
-        self._settings_edge_color = Color((1.0, 0.824, 0.0, 1.0))
-        self._settings_point_color = Color((0.0, 0.0, 1.0, 1.0))
-        self._settings_point_size = 5.0
-        self._settings_show_faces = True
-        self._settings_show_wire = False
-        self._settings_line_width = 1
-        self._settinge_show_points = False
-        self._settings_ambient_color = Color((0.1, 0.1, 0.1, 1.0))
-        self._settings_light_color = Color((1.0, 1.0, 1.0, 1.0))
-        self._settings_light_intensity = 1.0
-        self._settings_shiness = 1.0 / 200.0
+
+def transform_values(array, tr, shift, out=None, temp=None):
+    '''Return (array - shift) @ tr.T as float32 array. Rows are processed by chunks, so only one chunk of the temporary data is allocated.
+    If out is defined, the result is written into it. temp is an optional float32 buffer with at least min(len(array), TRANSFORM_CHUNK_SIZE) rows.'''
+    if out is None:
+        out = np.empty((len(array), 3), dtype=np.float32)
+    if temp is None or len(temp) < min(len(array), TRANSFORM_CHUNK_SIZE):
+        temp = np.empty((min(len(array), TRANSFORM_CHUNK_SIZE), 3), dtype=np.float32)
+    tr_t = np.ascontiguousarray(np.transpose(tr), dtype=np.float32)
+    shift = np.asarray(shift, dtype=np.float32)
+    for start in range(0, len(array), TRANSFORM_CHUNK_SIZE):
+        end = min(start + TRANSFORM_CHUNK_SIZE, len(array))
+        chunk = temp[:end - start]
+        np.subtract(array[start:end], shift, out=chunk, casting="unsafe")
+        np.matmul(chunk, tr_t, out=out[start:end])
+    return out
+
+
+def compact_indexes(indexes, vertices_count):  # store indexes as uint16 if it possible, and as uint32 otherwise
+    return indexes.astype(np.uint16 if vertices_count <= 65536 else np.uint32)
+
+
+class SceneObject(object):
+    '''One loaded mesh of the scene with own arrays, visuals, bounds, levels of detail and the picking structure.
+    Render settings are shared by all objects, overrides replace some of them for this object only.
+    The instance of repeated geometry uses arrays, levels of detail and the picking structure of the source object, and only the placement is own.'''
+    def __init__(self, file_path, mesh_data, settings, scene=None, transform=None, is_welded=False, overrides=None, placement=None, source=None):
+        self._file_path = file_path
+        self._raw_mesh_data = mesh_data  # (positions, poly_faces, edge_faces, normals) from SceneObjects.read_mesh_data
+        self._settings = settings  # the dictionary of SceneObjects, so changes of scene settings are visible here
+        self._overrides = dict(overrides) if overrides is not None else {}  # keys are the same as in the render settings
+        self._scene = scene
+        self._transform = transform  # orientation, scale and centering of raw positions, it is shared by all objects
+        self._placement = MatrixTransform(placement) if placement is not None else None  # the 4x4 matrix of this instance, it maps raw positions as row vectors like vispy transforms
+        self._visual_transform = ChainTransform([transform, self._placement]) if self._placement is not None else transform  # the placement is applied before the shared transform
+        self._source = source  # the object with the same mesh data, or None
+        self._is_welded = is_welded  # mesh data is readed with welded vertices
         self._light_direction = (-1, -1, -1)
-        self._light_shift_x = 0.0
-        self._light_shift_y = 0.0
-        self._orientation = orientation
-        self._scale = scale
-        self._center_align = is_centering
-        if render_settings is not None:  # set render settings by values from host application
-            self._save_render_settings(render_settings)
+        self._is_interaction = False
+        self._is_visible = True
+        self._has_visuals = False  # False if the object is drawn by the merged object or it is not added to the scene yet
 
-        # readed data
-        self._raw_mesh_data = None
-        self._mesh_data = None  # here we store mesh-data objects fro createing and modyfying meshes
+        self._mesh_datas = []  # one mesh data for each spatial chunk
+        self._chunk_bounds = None  # array (chunks, 2, 3) with min and max raw positions of each chunk
+        self._chunk_triangles = None  # indexes of triangles in each chunk, None if the mesh is not splitted
         self._calc_positions = None
         self._calc_normals = None
+        self._raw_bounds = Bounds()
+        self._positions_sum = np.zeros(3)  # used for the center of the scene
         self._edges_data = None
-        # points data stored in the _raw_mesh_data[0]
+        self._wire_mask = None  # for each triangle, what edges should be drawn by the wireframe filter
+        # levels of detail. Each level is (triangles_count, mesh_datas, chunk_bounds, chunk_triangles, edges_data, positions), the first level is the full mesh
+        self._lod_future = None
+        self._lod_levels = []
+        self._lod_error = None  # the message of the failed build, it is taken by the canvas
+        self._lod_index = 0
+        self._lod_selected = 0  # the level selected by the camera, it differs from _lod_index while the camera is moved
+        self._bvh = None
+        self._bvh_future = None
+        self._mesh_datas_cost = None  # (seconds, triangles, end time) of the last _create_mesh_datas
 
-        # visualse on the scene
-        self._mesh = None
+        # visuals on the scene
+        self._polygons = []  # one visual for each chunk
         self._edges = None
+        self._wire_filters = []
         self._points = None
+        self._points_positions = None  # positions of the points visual, it can be from other level of detail while the camera is moved
+        self._create_mesh_datas()
 
-    def set_orientation(self, mode):
-        is_new = False
-        if mode != self._orientation:
-            is_new = True
-        self._orientation = mode
-        if is_new:
-            if len(self._meshes) > 0:
-                self._create_mesh_datas(only_positions=False)
-                self._update_polygons(force_positions=True)
-                self._update_edges(force_positions=True)
-                self._update_points(force_positions=True)
+    def get_file_path(self):
+        return self._file_path
 
-    def set_scale(self, scale):
-        self._scale = scale
-        if len(self._meshes) > 0:
-            self._create_mesh_datas(only_positions=True)
-            self._update_polygons(force_positions=True)
-            self._update_edges(force_positions=True)
-            self._update_points(force_positions=True)
+    def get_mesh_data(self):
+        return self._raw_mesh_data
 
-    def set_centering(self, is_centering):
-        self._center_align = is_centering
-        if len(self._meshes) > 0:
-            self._create_mesh_datas(only_positions=True)
-            self._update_polygons(force_positions=True)
-            self._update_edges(force_positions=True)
-            self._update_points(force_positions=True)
-
-
-    def _read_obj(self, file_path):  # return (positions, poly_faces, edge_faces, normals) as np.array-s
-        obj_loader = OBJLoader(file_path)
-        normals_map = obj_loader.normals
-        normals_exist = True if len(normals_map) > 0 else False
-        vertices_map = obj_loader.vertices
-        start_face = 0
-        faces_list = []
-        edges_list = []
-        from_to_edges = {}  # key is original pair (i1, i2), value is the edge
-        vertices_list = []
-        normals_list = []
-        for face in obj_loader.faces:
-            face_vertices = face[0]
-            face_normals = face[1]
-            face_length = len(face_vertices)
-            # create vertices
-            for fv in face_vertices:
-                vertices_list.append(vertices_map[fv - 1])
-            if normals_exist:
-                for fn in face_normals:
-                    normals_list.append(normals_map[fn - 1])
-            # generate esges and faces ordering data
-            e_origin = [face_vertices[0], face_vertices[1]]
-            e_origin.sort()
-            e_origin = tuple(e_origin)
-            e = [start_face, start_face + 1]
-            e.sort()
-            e = tuple(e)
-            # if not e in edges_list:
-            if not e_origin in from_to_edges:
-                edges_list.append(e)
-                from_to_edges[e_origin] = e
-            e_origin = [face_vertices[0], face_vertices[face_length - 1]]
-            e_origin.sort()
-            e_origin = tuple(e_origin)
-            e = [start_face, start_face + face_length - 1]
-            e.sort()
-            e = tuple(e)
-            # if not e in edges_list:
-            if not e_origin in from_to_edges:
-                edges_list.append(e)
-                from_to_edges[e_origin] = e
-            for i in range(face_length - 2):
-                faces_list.append([start_face, start_face + i + 1, start_face + i + 2])
-                e_origin = [face_vertices[i + 1], face_vertices[i + 2]]
-                e_origin.sort()
-                e_origin = tuple(e_origin)
-                e = [start_face + i + 1, start_face + i + 2]
-                e.sort()
-                e = tuple(e)
-                if not e_origin in from_to_edges:
-                # if not e in edges_list:
-                    edges_list.append(e)
-                    from_to_edges[e_origin] = e
-            start_face += face_length
-        return (np.array(vertices_list), np.array(faces_list), np.array(edges_list), np.array(normals_list) if len(normals_list) > 0 else None)
-
-    def clear_scene(self):
-        if len(self._meshes) > 0:
-            for i in range(len(self._meshes)):
-                if self._meshes[i] is not None:
-                    self._meshes[i].parent = None
-        self._meshes = []
-        self._point = None
+    def get_positions_sum(self):  # return (the sum of placed raw positions, the number of positions)
+        count = len(self._raw_mesh_data[0])
+        if self._placement is None:
+            return (self._positions_sum, count)
+        matrix = self._placement.matrix
+        return (np.dot(self._positions_sum, matrix[:3, :3]) + count * matrix[3, :3], count)
+
+    def get_raw_bounds(self):  # bounds of placed raw positions
+        if self._placement is None or self._raw_bounds.is_empty():
+            return self._raw_bounds
+        axes = self._raw_bounds.get_axes(self._placement)
+        return Bounds([a[0] for a in axes], [a[1] for a in axes])
+
+    def get_placed_positions(self):  # raw positions with the placement of the instance
+        positions = self._raw_mesh_data[0]
+        if self._placement is None:
+            return positions
+        matrix = self._placement.matrix
+        return (np.dot(positions, matrix[:3, :3]) + matrix[3, :3]).astype(np.float32)
+
+    def get_placed_normals(self):
+        normals = self._raw_mesh_data[3]
+        if self._placement is None or normals is None:
+            return normals
+        # normals are mapped by the inverse transposed matrix, for row vectors it is the transposed inverse
+        normals = np.dot(normals, np.linalg.inv(self._placement.matrix[:3, :3]).T)
+        return (normals / np.maximum(np.linalg.norm(normals, axis=1), 1e-30)[:, None]).astype(np.float32)
+
+    def get_full_level(self):  # return (triangles_count, mesh_datas, chunk_bounds, chunk_triangles, edges_data, positions) of the full mesh
+        if len(self._lod_levels) > 0:
+            return self._lod_levels[0]
+        return (len(self._raw_mesh_data[1]), self._mesh_datas, self._chunk_bounds, self._chunk_triangles, self._edges_data, self._calc_positions)
+
+    def get_overrides(self):
+        return dict(self._overrides)
+
+    def set_overrides(self, overrides):  # replace all overrides and update visuals
+        self._overrides = dict(overrides)
+        self.update_polygons()
+        self.update_points()
+
+    def _setting(self, key):
+        return self._overrides[key] if key in self._overrides else self._settings[key]
+
+    def is_mergeable(self):  # merged arrays are not placed, so instances with placements are drawn by own visuals
+        return self._placement is None and len(self._raw_mesh_data[1]) <= MERGE_MAX_TRIANGLES
+
+    def get_material_key(self):  # objects with equal keys are drawn equally, so they can share visuals
+        return tuple([tuple(Color(self._setting(key)).rgba) if key.endswith("_color") else self._setting(key) for key in MATERIAL_SETTINGS])
+
+    def has_visuals(self):
+        return self._has_visuals
+
+    def is_visible(self):
+        return self._is_visible
+
+    def set_visible(self, is_visible):
+        self._is_visible = is_visible
+        for visual in self.get_visuals():
+            visual.visible = is_visible
+        if is_visible:  # hidden chunks are shown by the culling
+            self.update_culling()
+
+    def _create_mesh_datas(self):  # the time is kept for render statistics
+        start = time.perf_counter()
+        self._build_mesh_datas()
+        end = time.perf_counter()
+        self._mesh_datas_cost = (end - start, len(self._raw_mesh_data[1]), end)
+
+    def get_mesh_datas_cost(self):  # return (seconds, triangles, end time) of the last _create_mesh_datas or None
+        return self._mesh_datas_cost
+
+    def _build_mesh_datas(self):  # visuals use raw positions and normals, the orientation is applied by the transform
+        if self._source is not None:  # the instance draws mesh data of the source, so repeated geometry is stored once
+            (triangles_count, self._mesh_datas, self._chunk_bounds, self._chunk_triangles, self._edges_data, self._calc_positions) = self._source.get_full_level()
+            self._calc_normals = self._raw_mesh_data[3]
+            self._positions_sum = self._source._positions_sum
+            self._raw_bounds = self._source._raw_bounds
+            self._wire_mask = None
+            return
+        self._calc_positions = self._raw_mesh_data[0]
+        self._calc_normals = self._raw_mesh_data[3]
+        self._positions_sum = self._calc_positions.sum(axis=0, dtype=np.float64)
+        faces = self._raw_mesh_data[1]
+        self._chunk_triangles = self._split_chunks(self._calc_positions, faces) if len(faces) > CHUNK_TRIANGLES else None
+        self._mesh_datas = []
+        bounds = []
+        for triangles in (self._chunk_triangles if self._chunk_triangles is not None else [None]):
+            if triangles is None:
+                (positions, chunk_faces, normals) = (self._calc_positions, faces, self._calc_normals)
+            else:  # each chunk has own vertices
+                (used, chunk_faces) = np.unique(faces[triangles], return_inverse=True)
+                chunk_faces = compact_indexes(chunk_faces.reshape((-1, 3)), len(used))
+                positions = self._calc_positions[used]
+                normals = self._calc_normals[used] if self._calc_normals is not None else None
+            mesh_data = geometry.MeshData(vertices=positions, faces=chunk_faces)
+            if normals is not None:
+                mesh_data._vertex_normals = normals
+            self._mesh_datas.append(mesh_data)
+            bounds.append((positions.min(axis=0), positions.max(axis=0)) if len(positions) > 0 else np.zeros((2, 3)))
+        self._chunk_bounds = np.array(bounds)
+        self._raw_bounds = Bounds(self._chunk_bounds[:, 0].min(axis=0), self._chunk_bounds[:, 1].max(axis=0)) if len(self._calc_positions) > 0 else Bounds()
+        self._edges_data = geometry.MeshData(vertices=self._calc_positions, faces=self._raw_mesh_data[2])
+        self._wire_mask = None
+
+    def _split_chunks(self, positions, faces):  # return the list of triangle indexes of each chunk. Chunks are leaves of kd-tree with median splits along the longest axis
+        centers = positions[faces[:, 0]] + positions[faces[:, 1]] + positions[faces[:, 2]]
+        nodes = [np.arange(len(faces))]
+        chunks = []
+        while len(nodes) > 0:
+            triangles = nodes.pop()
+            if len(triangles) <= CHUNK_TRIANGLES:
+                chunks.append(triangles)
+                continue
+            node_centers = centers[triangles]
+            axis = np.argmax(node_centers.max(axis=0) - node_centers.min(axis=0))
+            half = len(triangles) // 2
+            order = np.argpartition(node_centers[:, axis], half)
+            # keep the order of triangles, so polygon fans are not mixed
+            nodes.append(np.sort(triangles[order[half:]]))
+            nodes.append(np.sort(triangles[order[:half]]))
+        return chunks
+
+    def start_background(self, executor, build_lods=False, build_picking=True):  # start to build the picking structure and levels of detail in the executor
+        if self._source is not None:  # use tasks or results of the source, they do not depend on the placement
+            self._bvh = self._source.get_bvh()
+            self._bvh_future = self._source._bvh_future
+            self._lod_future = self._source._lod_future
+            self._lod_levels = self._source._lod_levels
+            return
+        mesh_data = self._raw_mesh_data
+        if len(mesh_data[1]) > 0:
+            if build_picking:
+                self._bvh_future = executor.submit(BVH, mesh_data[0], mesh_data[1])
+            if build_lods and len(mesh_data[1]) >= LOD_MIN_TRIANGLES / LOD_RATIOS[0]:
+                self._lod_future = executor.submit(self._decimate_levels, mesh_data)
+
+    def add_visuals(self):
+        self._has_visuals = True
+        self._add_polygons()
+        self._add_edges()
+        self._update_wire_filter()
+        self._add_points()
+        self._set_light()
+
+    def remove_visuals(self):
+        for visual in self.get_visuals():
+            visual.parent = None
+        self._has_visuals = False
+        self._polygons = []
+        self._wire_filters = []
         self._edges = None
-        self._mesh = None
+        self._points = None
 
-    def is_clear(self):
-        return len(self._meshes) == 0
-
-    def get_all_bounds(self):
-        mesh_bounds = [(0, 0) for axis in range(3)]
-        edges_bounds = [(0, 0) for axis in range(3)]
-        points_bounds = [(0, 0) for axis in range(3)]
-        if self._mesh is not None:
-            mesh_bounds = [self._mesh.bounds(i) for i in range(3)]
-        if self._edges is not None:
-            if len(self._edges._bounds) >= 3:
-                edges_bounds = [self._edges.bounds(i) for i in range(3)]
-            else:
-                edges_bounds = [self._edges.bounds(0), (0.0, 0.0), self._edges.bounds(1)]
-        if self._points is not None:
-            points_bounds = [self._points.bounds(i) for i in range(3)]
-        return [(min(min(mesh_bounds[i][0], edges_bounds[i][0]), points_bounds[i][0]), max(max(mesh_bounds[i][1], edges_bounds[i][1]), points_bounds[i][1])) for i in range(3)]
+    def remove(self):  # remove visuals and forget background tasks
+        self.remove_visuals()
+        self._lod_future = None
+        self._bvh_future = None
+
+    def get_visuals(self):  # all visuals of the object share the transform
+        return [v for v in self._polygons + [self._edges, self._points] if v is not None]
+
+    def _create_polygons_visual(self, mesh_data):
+        mesh = PersistentMeshNode(meshdata=mesh_data,
+                                  color=self._setting("poly_color"),
+                                  parent=self._scene,
+                                  shading="smooth")
+        mesh.set_lighting(light_dir=self._light_direction, ambient_color=self._setting("ambient_color"), shininess=self._setting("shiness"))
+        mesh.transform = self._visual_transform
+        mesh.visible = self._is_visible
+        return mesh
 
     def _add_polygons(self):
-        if self._settings_show_faces:
-            self._mesh = scene.visuals.Mesh(meshdata=self._mesh_data,
-                                            color=self._settings_color,
-                                            parent=self._scene,
-                                            shading="smooth")
-            self._mesh.ambient_light_color = self._settings_ambient_color
-            self._mesh.shininess = self._settings_shiness
-            self._meshes.append(self._mesh)
-        else:
-            self._mesh = None
-
-    def _update_polygons(self, force_positions=False):
-        if self._mesh is not None and self._settings_show_faces is False:  # remove the polygons visual
-            self._meshes.remove(self._mesh)
-            self._mesh.parent = None
-            self._mesh = None
-        elif self._mesh is not None and self._settings_show_faces is True:  # update visual
-            self._mesh.color = self._settings_color
-            self._mesh.shininess = self._settings_shiness
-            self._mesh.ambient_light_color = self._settings_ambient_color
-            if force_positions:
-                self._mesh.set_data(meshdata=self._mesh_data)
-        elif self._mesh is None and self._settings_show_faces is True:  # add polygons
+        self._polygons = []
+        if self._setting("show_faces"):
+            for mesh_data in self._mesh_datas:
+                self._polygons.append(self._create_polygons_visual(mesh_data))
+
+    def _remove_polygons(self):
+        for mesh in self._polygons:
+            mesh.parent = None
+        self._polygons = []
+        self._wire_filters = []
+
+    def update_polygons(self, force_positions=False):
+        if not self._has_visuals:
+            return
+        if len(self._polygons) > 0 and self._setting("show_faces") is False:  # remove the polygons visuals
+            self._remove_polygons()
+        elif len(self._polygons) > 0 and self._setting("show_faces") is True:  # update visuals. Only the uniform color is changed, so buffers are not uploaded again
+            for i in range(len(self._polygons)):
+                self._polygons[i].color = self._setting("poly_color")
+                self._polygons[i].set_lighting(ambient_color=self._setting("ambient_color"), shininess=self._setting("shiness"))
+                if force_positions:
+                    self._polygons[i].set_data(meshdata=self._mesh_datas[i])
+        elif len(self._polygons) == 0 and self._setting("show_faces") is True:  # add polygons
             self._add_polygons()
-        self._set_light()
+        self.update_edges()  # the wireframe can be drawn only over visible polygons
+
+    def _is_shader_wire(self):
+        return self._setting("show_edges") and self._setting("shader_wireframe") and len(self._polygons) > 0
+
+    def _get_wire_mask(self):  # return the array (triangles, 3), True if the edge opposite to the triangle corner is an edge of the polygon
+        if self._source is not None:
+            return self._source._get_wire_mask()
+        if self._wire_mask is None:
+            faces = self._raw_mesh_data[1].astype(np.int64)
+            mask = np.ones((len(faces), 3), dtype=bool)
+            if self._is_welded:  # polygons share vertices, so find triangle edges in the list of polygon edges
+                edges = np.sort(self._raw_mesh_data[2].astype(np.int64), axis=1)
+                edge_keys = np.sort((edges[:, 0] << 32) + edges[:, 1])
+                for corner in range(3):
+                    a = np.minimum(faces[:, (corner + 1) % 3], faces[:, (corner + 2) % 3])
+                    b = np.maximum(faces[:, (corner + 1) % 3], faces[:, (corner + 2) % 3])
+                    keys = (a << 32) + b
+                    positions = np.minimum(np.searchsorted(edge_keys, keys), max(len(edge_keys) - 1, 0))
+                    mask[:, corner] = edge_keys[positions] == keys if len(edge_keys) > 0 else False
+            elif len(faces) > 0:  # each polygon is a fan (start, start + i + 1, start + i + 2) over own corners
+                is_first = np.ones(len(faces), dtype=bool)
+                is_first[1:] = faces[1:, 0] != faces[:-1, 0]
+                is_last = np.ones(len(faces), dtype=bool)
+                is_last[:-1] = is_first[1:]
+                mask[:, 1] = is_last  # the edge (start, start + i + 2) is the last edge of the polygon
+                mask[:, 2] = is_first  # the edge (start, start + 1) is the first edge
+            self._wire_mask = mask
+        return self._wire_mask
+
+    def _get_chunk_wire_mask(self, index):  # polygon edges are known only for the full mesh, other levels of detail draw all triangle edges
+        if self._lod_index > 0:
+            return None
+        if self._chunk_triangles is None:
+            return self._get_wire_mask()
+        return self._get_wire_mask()[self._chunk_triangles[index]]
+
+    def _update_wire_filter(self):
+        if self._is_shader_wire():
+            if len(self._wire_filters) == 0:
+                for i in range(len(self._polygons)):
+                    self._wire_filters.append(WireframeFilter(color=self._setting("edge_color"), width=self._setting("line_width"), edge_mask=self._get_chunk_wire_mask(i)))
+                    self._polygons[i].attach(self._wire_filters[i])
+            else:
+                for wire_filter in self._wire_filters:
+                    wire_filter.set_data(color=self._setting("edge_color"), width=self._setting("line_width"))
+        elif len(self._wire_filters) > 0:
+            for i in range(len(self._wire_filters)):
+                self._polygons[i].detach(self._wire_filters[i])
+            self._wire_filters = []
 
     def _add_edges(self):
-        if self._settings_show_wire:
-            self._edges = scene.visuals.Mesh(meshdata=self._edges_data,
-                                             color=self._settings_edge_color,
+        if self._setting("show_edges") and self._edges_data is not None and not self._is_shader_wire():
+            self._edges = PersistentMeshNode(meshdata=self._edges_data,
+                                             color=self._setting("edge_color"),
                                              mode="lines",
                                              parent=self._scene)
-            self._edges.set_gl_state(depth_func="lequal", line_width=self._settings_line_width, polygon_offset=(1.0, 1.0), polygon_offset_fill=True)
-            self._meshes.append(self._edges)
+            self._edges.set_gl_state(depth_func="lequal", line_width=self._setting("line_width"), polygon_offset=(1.0, 1.0), polygon_offset_fill=True)
+            self._edges.transform = self._visual_transform
+            self._edges.visible = self._is_visible
         else:
             self._edges = None
 
-    def _update_edges(self, force_positions=False):
-        if self._edges is not None and self._settings_show_wire is False:  # remove edges visual
-            self._meshes.remove(self._edges)
+    def update_edges(self, force_positions=False):
+        if not self._has_visuals:
+            return
+        if self._edges is not None and (self._setting("show_edges") is False or self._is_shader_wire()):  # remove edges visual
             self._edges.parent = None
             self._edges = None
-        elif self._edges is not None and self._settings_show_wire is True:  # update visual
-            self._edges.color = self._settings_edge_color
+        elif self._edges is not None and self._setting("show_edges") is True:  # update visual
+            self._edges.color = self._setting("edge_color")
             if force_positions:
                 self._edges.set_data(meshdata=self._edges_data)
-            self._edges.set_gl_state(depth_func="lequal", line_width=self._settings_line_width, polygon_offset=(1.0, 1.0), polygon_offset_fill=True)
-        elif self._edges is None and self._settings_show_wire is True:  # add edges visual
+            self._edges.set_gl_state(depth_func="lequal", line_width=self._setting("line_width"), polygon_offset=(1.0, 1.0), polygon_offset_fill=True)
+        elif self._edges is None and self._setting("show_edges") is True:  # add edges visual
             self._add_edges()
+        self._update_wire_filter()
         self._set_light()
 
     def _add_points(self):
-        if self._settinge_show_points:
+        if self._setting("show_points") and self._calc_positions is not None:
             self._points = scene.visuals.Markers(pos=self._calc_positions,
-                                                 # pos=self._raw_mesh_data[0],
                                                  edge_width=0.0,
-                                                 size=self._settings_point_size,
-                                                 face_color=self._settings_point_color,
+                                                 size=self._setting("point_size"),
+                                                 face_color=self._setting("point_color"),
                                                  parent=self._scene)
+            self._points_positions = self._calc_positions
             self._points.antialias = 0
-            self._meshes.append(self._points)
+            self._points.transform = self._visual_transform
+            self._points.visible = self._is_visible
         else:
             self._points = None
 
-    def _update_points(self, force_positions=False):
-        if self._points is not None and self._settinge_show_points is False:  # remove edges visual
-            if self._points in self._meshes:
-                self._meshes.remove(self._points)
+    def update_points(self, force_positions=False):
+        if not self._has_visuals:
+            return
+        if self._points is not None and self._setting("show_points") is False:  # remove points visual
             self._points.parent = None
             self._points = None
-        elif self._points is not None and self._settinge_show_points is True:  # update visual
+        elif self._points is not None and self._setting("show_points") is True:  # update visual
+            self._points_positions = self._calc_positions
             self._points.set_data(pos=self._calc_positions,
-                                  # pos=self._raw_mesh_data[0],
-                                  size=self._settings_point_size, edge_width=0.0,
-                                  edge_width_rel=None, face_color=self._settings_point_color)
-        elif self._points is None and self._settinge_show_points is True:  # add edges visual
+                                  size=self._setting("point_size"), edge_width=0.0,
+                                  edge_width_rel=None, face_color=self._setting("point_color"))
+        elif self._points is None and self._setting("show_points") is True:  # add points visual
             self._add_points()
         self._set_light()
 
+    def set_light(self, direction):
+        self._light_direction = direction
+        self._set_light()
+
     def _set_light(self):
-        if self._mesh is not None:
-            self._mesh.light_dir = self._light_direction
+        for mesh in self._polygons:
+            mesh.set_lighting(light_dir=self._light_direction)
 
-    def _apply_transform(self, a, tr, shift):
-        v = a - shift
-        return tr @ v
+    def update_culling(self):  # hide chunks outside of the camera frustum. Return True if the visibility is changed
+        if not self._is_visible or len(self._polygons) < 2 or self._chunk_bounds is None or len(self._chunk_bounds) != len(self._polygons):
+            return False
+        # map corners of chunk boxes to the clip space of the render, where the frustum is -w <= x, y, z <= w
+        corner_index = np.array([[i, j, k] for i in range(2) for j in range(2) for k in range(2)])
+        corners = self._chunk_bounds[:, corner_index, [0, 1, 2]]
+        clip = self._polygons[0].get_transform("visual", "render").map(corners.reshape((-1, 3))).reshape((len(corners), 8, 4))
+        w = clip[:, :, 3]
+        is_outside = np.zeros(len(corners), dtype=bool)
+        for axis in range(3):
+            is_outside |= np.all(clip[:, :, axis] > w, axis=1) | np.all(clip[:, :, axis] < -1 * w, axis=1)
+        is_changed = False
+        for i in range(len(self._polygons)):
+            if self._polygons[i].visible == is_outside[i]:
+                self._polygons[i].visible = not is_outside[i]
+                is_changed = True
+        return is_changed
 
-    def _apply_orientation_to_values(self, array, use_scale=False):
-        shift = [0.0, 0.0, 0.0]
-        scale = self._scale if use_scale else 1.0
-        if use_scale and self._center_align:
-            shift = np.average(array, axis=0)
+    def get_visible_stats(self):  # return (visible chunks, all chunks, visible triangles)
+        visible = [i for i in range(len(self._polygons)) if self._polygons[i].visible]
+        return (len(visible), len(self._polygons), sum([len(self._mesh_datas[i].get_faces()) for i in visible]))
+
+    def get_draw_calls(self):  # each visible visual is drawn by one call
+        return len([v for v in self.get_visuals() if v.visible])
+
+    def get_visible_points(self):
+        return len(self._points_positions) if self._points is not None and self._points.visible else 0
+
+    def get_bvh(self):  # return the picking structure or None, if it is not built yet
+        if self._bvh is None and self._bvh_future is not None and self._bvh_future.done():
+            self._bvh = self._bvh_future.result()
+            self._bvh_future = None
+        return self._bvh
+
+    def pick(self, origin, direction):  # the ray is in raw coordinates. Return (distance along the direction, triangle index, closest vertex index, closest edge (vertex, vertex), placed raw position) or None
+        if not self._is_visible:
+            return None
+        if self._placement is not None:  # the tree is built for the geometry, so the ray is mapped to the space of the instance. The placement is affine, so distances along the ray are kept
+            end = self._placement.imap(origin + direction)
+            origin = self._placement.imap(origin)
+            origin = origin[:3] / origin[3]
+            direction = end[:3] / end[3] - origin
+        bvh = self.get_bvh()
+        hit = bvh.intersect(origin, direction) if bvh is not None else None
+        if hit is None:
+            return None
+        (triangle, t, _) = hit
+        corners = self._raw_mesh_data[1][triangle].astype(np.int64)
+        points = self._raw_mesh_data[0][corners].astype(np.float64)
+        point = origin + t * direction
+        # distances from the hit point to triangle edges (corner i, corner i + 1)
+        segments = np.roll(points, -1, axis=0) - points
+        along = np.clip(np.einsum("ij,ij->i", point - points, segments) / np.maximum(np.einsum("ij,ij->i", segments, segments), 1e-30), 0.0, 1.0)
+        edge_index = np.argmin(np.linalg.norm(points + along[:, None] * segments - point, axis=1))
+        vertex = int(corners[np.argmin(np.linalg.norm(points - point, axis=1))])
+        if self._placement is not None:
+            point = self._placement.map(point)
+            point = point[:3] / point[3]
+        return (t, triangle, vertex, (int(corners[edge_index]), int(corners[(edge_index + 1) % 3])), point)
+
+    def _decimate_levels(self, mesh_data):  # called in the worker thread, return the list of (positions, poly_faces, edge_faces, normals) from detailed to coarse levels
+        levels = []
+        (positions, faces, normals) = (mesh_data[0], mesh_data[1], mesh_data[3])
+        for ratio in LOD_RATIOS:
+            target_count = int(len(mesh_data[1]) * ratio)
+            if target_count < LOD_MIN_TRIANGLES:
+                break
+            # each level is decimated from the previous one, it is faster than from the full mesh
+            (positions, faces, normals) = decimate_mesh(positions, faces, target_count, normals)
+            levels.append((positions, compact_indexes(faces, len(positions)), compact_indexes(mesh_edges(faces), len(positions)), normals))
+        return levels
+
+    def _collect_lods(self):  # create mesh data objects for levels of detail, when they are built
+        if self._lod_future is None or not self._lod_future.done():
+            return
+        future = self._lod_future
+        self._lod_future = None
+        try:
+            levels = future.result()
+        except Exception as error:
+            if self._source is None:  # instances share the task of the source, so the failure is reported once
+                self._lod_error = str(error)
+            return
+        self._lod_levels = [(len(self._raw_mesh_data[1]), self._mesh_datas, self._chunk_bounds, self._chunk_triangles, self._edges_data, self._calc_positions)]
+        for (positions, faces, edges, normals) in levels:  # levels are drawn when the whole mesh is small on the screen, so they are not splitted
+            mesh_data = geometry.MeshData(vertices=positions, faces=faces)
+            if normals is not None:
+                mesh_data._vertex_normals = normals
+            bounds = np.array([(positions.min(axis=0), positions.max(axis=0))])
+            self._lod_levels.append((len(faces), [mesh_data], bounds, None, geometry.MeshData(vertices=positions, faces=edges), positions))
+
+    def is_lods_building(self):
+        return self._lod_future is not None
+
+    def pop_lod_error(self):  # return the message of the failed build of levels of detail or None
+        error = self._lod_error
+        self._lod_error = None
+        return error
+
+    def update_lod(self, canvas_size, camera_position, fov):  # select the level of detail by the size of projected bounds, return True if the level is changed
+        self._collect_lods()
+        if len(self._lod_levels) < 2:
+            return False
+        bounds = self._raw_bounds.get_axes(self._visual_transform)
+        center = np.array([(bounds[i][0] + bounds[i][1]) * 0.5 for i in range(3)])
+        radius = 0.5 * np.linalg.norm([bounds[i][1] - bounds[i][0] for i in range(3)])
+        distance = np.linalg.norm(np.array(camera_position) - center)
+        index = 0
+        if distance > radius and fov > 0.0:  # otherwise the camera is inside the mesh or it is orthographic
+            pixels = radius / (distance * math.tan(math.radians(fov) * 0.5)) * canvas_size[1]  # the diameter of the projected bounding sphere
+            budget = pixels * pixels * LOD_TRIANGLES_PER_PIXEL
+            for i in range(len(self._lod_levels)):
+                if self._lod_levels[i][0] >= budget:
+                    index = i
+        self._lod_selected = index
+        if self._is_interaction:  # the coarse level is used until the camera is stopped
+            return False
+        return self._set_lod(index)
+
+    def _set_lod(self, index):  # visuals use mesh data of the current level
+        if index == self._lod_index:
+            return False
+        self._lod_index = index
+        (triangles_count, self._mesh_datas, self._chunk_bounds, self._chunk_triangles, self._edges_data, self._calc_positions) = self._lod_levels[index]
+        if len(self._polygons) == len(self._mesh_datas):  # the wireframe filter use polygon edges only for the full mesh, and triangle edges for other levels
+            for i in range(len(self._polygons)):
+                self._polygons[i].set_mesh_data(self._mesh_datas[i])
+        elif len(self._polygons) > 0:  # the number of chunks is changed, so recreate visuals
+            self._remove_polygons()
+            self._add_polygons()
+            self._update_wire_filter()
+            for wire_filter in self._wire_filters:  # new filters are disabled while the camera is moved
+                wire_filter.set_data(enabled=not self._is_interaction)
+        if self._edges is not None:
+            self._edges.set_mesh_data(self._edges_data)
+        if self._points is not None and not self._is_interaction:  # hidden points are updated after the interaction
+            self.update_points()
+        self._set_light()
+        return True
+
+    def set_interaction(self, is_active):  # while the camera is moved, hide points and edges and draw the coarsest level of detail. Return True if the object is changed
+        if is_active == self._is_interaction:
+            return False
+        self._is_interaction = is_active
+        for visual in (self._edges, self._points):
+            if visual is not None:
+                visual.visible = not is_active and self._is_visible
+        for wire_filter in self._wire_filters:
+            wire_filter.set_data(enabled=not is_active)
+        if len(self._lod_levels) > 1:
+            self._set_lod(len(self._lod_levels) - 1 if is_active else self._lod_selected)
+        if not is_active and self._points is not None and self._points_positions is not self._calc_positions:
+            self.update_points()
+        return True
+
+
+class MergedObject(SceneObject):
+    '''Small static objects with the same render settings in shared vertex and index buffers, so they are drawn by one visual of each kind.
+    Members are placed one after another in merged arrays, a hidden member is excluded by its ranges of vertices, faces and edges.'''
+    def __init__(self, members, settings, scene=None, transform=None, is_welded=False):
+        self._members = members
+        datas = [m.get_mesh_data() for m in members]
+        self._vertex_starts = np.cumsum([0] + [len(d[0]) for d in datas])
+        self._face_starts = np.cumsum([0] + [len(d[1]) for d in datas])
+        self._edge_starts = np.cumsum([0] + [len(d[2]) for d in datas])
+        positions = np.concatenate([d[0] for d in datas])
+        faces = compact_indexes(np.concatenate([datas[i][1].astype(np.int64) + self._vertex_starts[i] for i in range(len(datas))]), len(positions))
+        edges = compact_indexes(np.concatenate([datas[i][2].astype(np.int64) + self._vertex_starts[i] for i in range(len(datas))]), len(positions))
+        normals = np.concatenate([d[3] for d in datas]) if all([d[3] is not None for d in datas]) else None
+        self._merged_data = (positions, faces, edges, normals)
+        SceneObject.__init__(self, None, self._get_visible_data(), settings, scene=scene, transform=transform, is_welded=is_welded, overrides=members[0].get_overrides())
+
+    def get_members(self):
+        return self._members
+
+    def _get_visible_data(self):  # return merged arrays of visible members
+        parts = [i for i in range(len(self._members)) if self._members[i].is_visible()]
+        if len(parts) == len(self._members) or len(parts) == 0:  # the merged object is hidden, if all members are hidden
+            return self._merged_data
+        (positions, faces, edges, normals) = self._merged_data
+        # visible vertices are packed together, so indexes of each member are shifted by the size of hidden vertices before it
+        new_starts = np.cumsum([0] + [self._vertex_starts[i + 1] - self._vertex_starts[i] for i in parts])
+        shifts = [new_starts[j] - self._vertex_starts[parts[j]] for j in range(len(parts))]
+
+        def select(array, starts, shifts=None):
+            return np.concatenate([array[starts[i]:starts[i + 1]] if shifts is None else array[starts[i]:starts[i + 1]].astype(np.int64) + shifts[j] for (j, i) in enumerate(parts)])
+        new_positions = select(positions, self._vertex_starts)
+        return (new_positions,
+                compact_indexes(select(faces, self._face_starts, shifts), len(new_positions)),
+                compact_indexes(select(edges, self._edge_starts, shifts), len(new_positions)),
+                select(normals, self._vertex_starts) if normals is not None else None)
+
+    def update_members_visibility(self):  # rebuild buffers, when members are hidden or shown
+        is_any_visible = any([m.is_visible() for m in self._members])
+        if is_any_visible:
+            self._raw_mesh_data = self._get_visible_data()
+            self._create_mesh_datas()
+            if self._has_visuals:
+                self.remove_visuals()
+                self.add_visuals()
+        self.set_visible(is_any_visible)
+
+
+class SceneObjects(object):
+    '''The registry of scene objects. Objects share render settings, the transform and background workers,
+    so all loaded files are placed together and setting changes are applied in one pass over the registry.'''
+    def __init__(self, parent_view=None, render_settings=None, orientation=2, scale=1.0, is_centering=True, weld_vertices=False, mesh_cache=None, loader_workers=1, stream_batches_per_update=4, build_lods=True, merge_small_meshes=True, normals_weighting=1, crease_angle=180.0, build_picking=True):
+        self._meshes = []  # visuals of the streamed file, they are replaced by the object when the file is loaded
+        self._view = parent_view
+        self._scene = parent_view.scene if parent_view is not None else None  # without view the object can only read meshes
+        # the set of render settings, keys are the same as in the render settings parameters
+        # set it default values
+        self._settings = {"poly_color": Color((0.8, 0.8, 0.8, 1.0)),
+                          "edge_color": Color((1.0, 0.824, 0.0, 1.0)),
+                          "point_color": Color((0.0, 0.0, 1.0, 1.0)),
+                          "point_size": 5.0,
+                          "show_faces": True,
+                          "show_edges": False,
+                          "shader_wireframe": False,  # draw edges by the shader of the polygons visual instead of the separate lines visual
+                          "reduce_quality": True,  # hide points and edges while the camera is moved
+                          "restore_delay": 300,  # in milliseconds after the camera is stopped
+                          "line_width": 1,
+                          "show_points": False,
+                          "ambient_color": Color((0.1, 0.1, 0.1, 1.0)),
+                          "light_color": Color((1.0, 1.0, 1.0, 1.0)),
+                          "light_intensity": 1.0,
+                          "shiness": 1.0 / 200.0,
+                          "light_shift_x": 0.0,
+                          "light_shift_y": 0.0}
+        self._light_direction = (-1, -1, -1)
+        self._orientation = orientation
+        self._scale = scale
+        self._center_align = is_centering
+        self._weld_vertices = weld_vertices  # if True, vertices are shared between faces and splitted only by different normals
+        self._mesh_cache = mesh_cache  # MeshCache instance or None
+        self._loader_workers = loader_workers  # the number of processes for parsing large files
+        self._stream_batches_per_update = stream_batches_per_update  # when the file is streamed, the new visual is created after this number of batches
+        self._build_lods = build_lods  # build decimated levels of detail in the background after the mesh is loaded
+        self._merge_small = merge_small_meshes  # draw small objects with the same render settings by shared visuals
+        self._build_picking = build_picking  # build picking structures in the background, the application without picking does not need them
+        # normals of files without vn records are computed once after reading. The weighting is the index in NORMALS_WEIGHTINGS,
+        # triangles with normals differ by more than the crease angle (in degrees) are not smoothed together
+        self._normals_weighting = normals_weighting
+        self._crease_angle = crease_angle
+        self._lod_executor = ThreadPoolExecutor(max_workers=1)  # levels of detail and picking structures of all objects are built here
+        if render_settings is not None:  # set render settings by values from host application
+            self._save_render_settings(render_settings)
+
+        self._objects = []  # SceneObject for each loaded file
+        # readed geometries, so copies of the file are parsed and stored once. Each entry is [file size, modification time, file path, content hash or None, read index, mesh data]
+        # the content is hashed only when other file with the same size is readed
+        self._geometries = []
+        self._reads_count = 0
+        self._geometries_lock = threading.Lock()  # geometries are found and added by the loader thread, but released by the main thread
+        self._batches = []  # MergedObject for each group of merged small objects
+        self._is_batches_changed = False  # objects or their settings are changed after the last update_scene
+        self._is_center_changed = False  # objects are added or removed, the center is updated once by update_scene
+        self._center = None  # the average of raw positions of all objects, used for centering
+        self._transform = MatrixTransform()  # orientation, scale and centering of raw meshes. All object visuals share it
+        self._scene_bounds = None  # raw bounds of all objects mapped by the transform, it is reset when the transform or objects are changed
+        self._bake_buffers = {}  # float32 buffers reused by _apply_orientation_to_values
+        # streamed data. Each batch is (positions, faces, normals), pending batches are not added to the scene yet
+        self._stream_pending = []
+        self._stream_bounds = Bounds()  # all streamed positions, they are already in the scene coordinates
+        self._is_interaction = False
+
+    # orientation, scale and centering are not applied to the vertices, but to the transform of all object visuals
+    def set_orientation(self, mode):
+        if mode != self._orientation:
+            self._orientation = mode
+            self._update_transform()
+
+    def set_scale(self, scale):
+        self._scale = scale
+        self._update_transform()
+
+    def set_centering(self, is_centering):
+        self._center_align = is_centering
+        self._update_transform()
+
+    def _update_center(self):  # all objects are centered together, so parts of the assembly keep their places
+        sums = [obj.get_positions_sum() for obj in self._objects]
+        count = sum([s[1] for s in sums])
+        self._center = np.sum([s[0] for s in sums], axis=0) / count if count > 0 else np.zeros(3)
+        self._update_transform()
+
+    def _update_transform(self):
+        tr = self._get_orientation_matrix(self._scale)
+        shift = self._center if self._center_align and self._center is not None else np.zeros(3)
+        # vispy transforms map row vectors, so use transposed matrix
+        matrix = np.eye(4)
+        matrix[:3, :3] = tr.T
+        matrix[3, :3] = -1 * np.dot(shift, tr.T)
+        if not np.array_equal(matrix, self._transform.matrix):  # the change of the shared transform updates all visuals
+            self._transform.matrix = matrix
+        self._scene_bounds = None
+
+    def _reload_objects(self, is_read):  # create objects again with the same files and overrides. Mesh data is readed again only if is_read is True
+        UPLOAD_COUNTER.start_operation("reload")
+        objects = [(obj.get_file_path(), obj.get_mesh_data(), obj.get_overrides()) for obj in self._objects]
+        self.clear_scene()
+        for (file_path, mesh_data, overrides) in objects:
+            self.set_mesh_data(file_path, self.read_mesh_data(file_path) if is_read else mesh_data, is_append=True, overrides=overrides)
+        self.update_scene()
+
+    def set_weld_vertices(self, is_weld):
+        is_new = is_weld != self._weld_vertices
+        self._weld_vertices = is_weld
+        if is_new:  # reload all files
+            self._clear_geometries()  # geometries are readed with other variant
+            self._reload_objects(True)
+
+    def set_normals_weighting(self, weighting):
+        is_new = weighting != self._normals_weighting
+        self._normals_weighting = weighting
+        if is_new:  # normals are computed when files are readed
+            self._clear_geometries()
+            self._reload_objects(True)
+
+    def set_crease_angle(self, angle):
+        is_new = angle != self._crease_angle
+        self._crease_angle = angle
+        if is_new:
+            self._clear_geometries()
+            self._reload_objects(True)
+
+    def set_build_lods(self, is_build):
+        is_new = is_build != self._build_lods
+        self._build_lods = is_build
+        if is_new:  # recreate visuals with full meshes, levels are built again if it needed
+            self._reload_objects(False)
+
+    def set_merge_small_meshes(self, is_merge):
+        self._merge_small = is_merge
+        self._is_batches_changed = True
+        self.update_scene()
+
+    def update_scene(self):  # update the center and merge small objects with equal render settings into shared buffers. It should be called after objects are added or changed. Return True if the scene is changed
+        is_center_changed = self._is_center_changed
+        if self._is_center_changed:
+            self._is_center_changed = False
+            self._update_center()
+        if not self._is_batches_changed:
+            return is_center_changed
+        self._is_batches_changed = False
+        groups = {}
+        if self._merge_small:
+            # instances of repeated geometry share arrays, merging would copy them for each instance
+            instances = {}
+            for obj in self._objects:
+                instances[id(obj.get_mesh_data())] = instances.get(id(obj.get_mesh_data()), 0) + 1
+            for obj in self._objects:
+                if obj.is_mergeable() and instances[id(obj.get_mesh_data())] == 1:
+                    groups.setdefault(obj.get_material_key(), []).append(obj)
+        merged = [members for members in groups.values() if len(members) > 1]
+        is_changed = [batch.get_members() for batch in self._batches] != merged
+        if is_changed:
+            for batch in self._batches:
+                batch.remove()
+            self._batches = []
+            for members in merged:
+                batch = MergedObject(members, self._settings, scene=self._scene, transform=self._transform, is_welded=self._weld_vertices)
+                batch.set_light(self._light_direction)
+                batch.add_visuals()
+                if not any([m.is_visible() for m in members]):
+                    batch.set_visible(False)
+                self._batches.append(batch)
+        merged_ids = set([id(obj) for members in merged for obj in members])
+        for obj in self._objects:  # other objects are drawn by own visuals
+            if id(obj) in merged_ids and obj.has_visuals():
+                obj.remove_visuals()
+                is_changed = True
+            elif id(obj) not in merged_ids and not obj.has_visuals():
+                obj.add_visuals()
+                is_changed = True
+        return is_changed or is_center_changed
+
+    def _weld(self, obj_loader, faces, edges, corner_normals=None):  # return (positions, poly_faces, edge_faces, normals) with one vertex for each unique pair (position, normal). corner_normals are computed normals of face corners, if the file has no normals
+        # welded arrays are smaller in the memory, in the mesh cache and in buffers of edges and points. Polygons are uploaded per face corner by MeshVisual anyway
+        face_vertices = obj_loader.face_vertices.astype(np.int64)
+        normals_exist = len(obj_loader.normals) > 0
+        if normals_exist:
+            # normals with equal values but different indexes should not split vertices
+            (unique_normals, normal_ids) = np.unique(obj_loader.normals, axis=0, return_inverse=True)
+            keys = (face_vertices << 32) + normal_ids.reshape(-1)[obj_loader.face_normals - 1]
+        elif corner_normals is not None and self._crease_angle < 180.0:  # vertices are splitted on creases
+            (unique_normals, normal_ids) = np.unique(corner_normals, axis=0, return_inverse=True)
+            keys = (face_vertices << 32) + normal_ids.reshape(-1)
+        else:  # smooth normals are equal for all corners of the vertex
+            keys = face_vertices
+        (unique_keys, first_corners, corner_to_vertex) = np.unique(keys, return_index=True, return_inverse=True)
+        corner_to_vertex = corner_to_vertex.reshape(-1)
+        vertices = obj_loader.vertices[face_vertices[first_corners] - 1]
+        if normals_exist:
+            normals = obj_loader.normals[obj_loader.face_normals[first_corners] - 1]
+        else:
+            normals = corner_normals[first_corners] if corner_normals is not None else None
+        edges = np.sort(corner_to_vertex[edges], axis=1)
+        return (vertices, self._compact_indexes(corner_to_vertex[faces], len(vertices)), self._compact_indexes(edges, len(vertices)), normals)
+
+    def _compact_indexes(self, indexes, vertices_count):  # store indexes as uint16 if it possible, and as uint32 otherwise
+        return compact_indexes(indexes, vertices_count)
+
+    def _triangulate(self, face_sizes):  # return (face_starts, triangles) for faces with corners stored one after another
+        # each face corner is a separate vertex, so the face starts from the sum of previous face sizes
+        face_starts = np.cumsum(face_sizes) - face_sizes
+        # triangulate all faces as fans: i-th triangle of the face is (start, start + i + 1, start + i + 2)
+        triangles_count = np.maximum(face_sizes - 2, 0)
+        triangle_starts = np.repeat(face_starts, triangles_count)
+        triangle_local = np.arange(len(triangle_starts)) - np.repeat(np.cumsum(triangles_count) - triangles_count, triangles_count)
+        faces = np.stack((triangle_starts, triangle_starts + triangle_local + 1, triangle_starts + triangle_local + 2), axis=1)
+        return (face_starts, faces)
+
+    def _create_stream_batch(self, vertices, normals, block, shift):  # return (positions, faces, normals) of the block faces in the scene coordinates
+        face_vertices = block["face_v"]
+        if face_vertices.max() > len(vertices) or (len(normals) > 0 and block["face_vn"].max() > len(normals)):  # faces use vertices from the next blocks
+            return None
+        (face_starts, faces) = self._triangulate(block["face_sizes"].astype(np.int64))
+        positions = self._apply_orientation_to_values(vertices[face_vertices - 1], use_scale=True, shift=shift)
+        batch_normals = self._apply_orientation_to_values(normals[block["face_vn"] - 1], use_scale=False) if len(normals) > 0 else None
+        return (positions, faces, batch_normals)
+
+    def _read_obj(self, file_path, progress_callback=None, batch_callback=None):  # return (positions, poly_faces, edge_faces, normals) as np.array-s
+        block_callback = None
+        if batch_callback is not None:  # send faces to the callback as soon as they are parsed
+            stream_shift = []
+
+            def block_callback(merger, block):
+                vertices = merger.vertices_so_far.data
+                if len(stream_shift) == 0:  # usually all vertices are defined before faces, so the center is known at the first block with faces
+                    stream_shift.append(vertices.mean(axis=0, dtype=np.float64) if self._center_align else np.zeros(3))
+                batch = self._create_stream_batch(vertices, merger.normals_so_far.data, block, stream_shift[0])
+                if batch is not None:
+                    batch_callback(batch)
+        obj_loader = OBJArrayLoader(file_path, progress_callback=progress_callback, workers=self._loader_workers, block_callback=block_callback)
+        face_vertices = obj_loader.face_vertices
+        face_sizes = obj_loader.face_sizes.astype(np.int64)
+        corners_count = len(face_vertices)
+        # create vertices
+        vertices = obj_loader.vertices[face_vertices - 1]
+        normals = obj_loader.normals[obj_loader.face_normals - 1] if len(obj_loader.normals) > 0 and corners_count > 0 else None
+        (face_starts, faces) = self._triangulate(face_sizes)
+        # each face of size n generates n edges candidates in the order (0, 1), (0, n - 1), (1, 2), ..., (n - 2, n - 1)
+        edge_face_starts = np.repeat(face_starts, face_sizes)
+        edge_local = np.arange(corners_count) - edge_face_starts
+        edge_face_sizes = np.repeat(face_sizes, face_sizes)
+        edge_a = np.where(edge_local < 2, 0, edge_local - 1) + edge_face_starts
+        edge_b = np.where(edge_local == 0, 1, np.where(edge_local == 1, edge_face_sizes - 1, edge_local)) + edge_face_starts
+        # the edge is unique by the pair of original vertices, keep the first one
+        original_a = face_vertices[edge_a].astype(np.int64)
+        original_b = face_vertices[edge_b].astype(np.int64)
+        keys = (np.minimum(original_a, original_b) << 32) + (np.maximum(original_a, original_b) & 0xFFFFFFFF)
+        del edge_local, edge_face_sizes, original_a, original_b  # release temporary arrays before the sort, it is the peak of the memory usage
+        first_edges = np.sort(np.unique(keys, return_index=True)[1])
+        edges = np.stack((edge_a[first_edges], edge_b[first_edges]), axis=1)
+        if normals is None and corners_count > 0:  # compute normals once here, otherwise MeshData computes them again for each new data of visuals
+            normals = smooth_normals(vertices, faces, vertex_ids=face_vertices, weighting=NORMALS_WEIGHTINGS[self._normals_weighting], crease_angle=self._crease_angle)
+        if self._weld_vertices:
+            return self._weld(obj_loader, faces, edges, corner_normals=normals if len(obj_loader.normals) == 0 else None)
+        return (vertices, self._compact_indexes(faces, corners_count), self._compact_indexes(edges, corners_count), normals)
+
+    def _find_geometry(self, file_path):  # return the mesh data of the readed file with the same content or None
+        stat = os.stat(file_path)
+        content_hash = None
+        with self._geometries_lock:  # files are hashed without the lock, so the main thread is not blocked
+            entries = list(self._geometries)
+        for entry in entries:
+            if entry[0] != stat.st_size:
+                continue
+            if entry[3] is None:
+                try:
+                    entry_stat = os.stat(entry[2])
+                except OSError:
+                    continue
+                if entry_stat.st_size != entry[0] or entry_stat.st_mtime_ns != entry[1]:  # the file is changed after it was readed
+                    continue
+                entry[3] = file_content_hash(entry[2])
+            if content_hash is None:
+                content_hash = file_content_hash(file_path)
+            if entry[3] == content_hash:
+                return entry[5]
+        return None
+
+    def _add_geometry(self, file_path, mesh_data):
+        try:
+            stat = os.stat(file_path)
+        except (OSError, TypeError):  # the mesh data is not readed from the file
+            return
+        with self._geometries_lock:
+            for entry in self._geometries:
+                if entry[5] is mesh_data:
+                    return
+            self._reads_count += 1
+            self._geometries.append([stat.st_size, stat.st_mtime_ns, file_path, None, self._reads_count, mesh_data])
+
+    def _clear_geometries(self):
+        with self._geometries_lock:
+            self._geometries = []
+
+    def _release_geometries(self, last_read=None):  # forget geometries, which are not used by objects and readed before the read index last_read (all by default)
+        used = set([id(obj.get_mesh_data()) for obj in self._objects])
+        with self._geometries_lock:
+            self._geometries = [entry for entry in self._geometries if id(entry[5]) in used or (last_read is not None and entry[4] >= last_read)]
+
+    def read_mesh_data(self, file_path, progress_callback=None, batch_callback=None):  # return the same as _read_obj, but use the cache if it defined. Does not change the scene, so can be called from any thread
+        mesh_data = self._find_geometry(file_path)
+        if mesh_data is not None:  # the copy of the loaded file, its arrays are shared
+            return mesh_data
+        variant = ("weld" if self._weld_vertices else "") + "|normals %d %g" % (self._normals_weighting, self._crease_angle)
+        mesh_data = self._mesh_cache.get(file_path, variant) if self._mesh_cache is not None else None
+        if mesh_data is None:
+            mesh_data = self._read_obj(file_path, progress_callback=progress_callback, batch_callback=batch_callback)
+            if self._mesh_cache is not None:
+                self._mesh_cache.put(file_path, mesh_data, variant)
+        self._add_geometry(file_path, mesh_data)
+        return mesh_data
+
+    def clear_scene(self, last_read=None):  # geometries readed from the read index last_read are kept for files, which are loaded now
+        for obj in self._objects + self._batches:
+            obj.remove()
+        self._objects = []
+        self._batches = []
+        self._release_geometries(last_read)
+        for mesh in self._meshes:
+            mesh.parent = None
+        self._meshes = []
+        self._center = None
+        self._scene_bounds = None
+        self._stream_pending = []
+        self._stream_bounds = Bounds()
+
+    def add_stream_batch(self, batch):  # batch is (positions, faces, normals) from the read_mesh_data batch_callback. Should be called in the main thread
+        self._stream_pending.append(batch)
+        self._stream_bounds.extend(batch[0])
+        if len(self._stream_pending) >= self._stream_batches_per_update:
+            return self.flush_stream()
+        return False
+
+    def flush_stream(self):  # add pending batches to the scene as one visual. Each batch is uploaded once, so the total cost is linear to the file size. Return True if the scene is changed
+        if len(self._stream_pending) == 0:
+            return False
+        UPLOAD_COUNTER.start_operation("stream")
+        pending = self._stream_pending
+        self._stream_pending = []
+        shifts = np.cumsum([0] + [len(b[0]) for b in pending[:-1]])
+        positions = np.concatenate([b[0] for b in pending])
+        faces = self._compact_indexes(np.concatenate([pending[i][1] + shifts[i] for i in range(len(pending))]), len(positions))
+        mesh_data = geometry.MeshData(vertices=positions, faces=faces)
+        if pending[0][2] is not None:
+            mesh_data._vertex_normals = np.concatenate([b[2] for b in pending])
+        if self._settings["show_faces"]:
+            mesh = PersistentMeshNode(meshdata=mesh_data,
+                                      color=self._settings["poly_color"],
+                                      parent=self._scene,
+                                      shading="smooth")
+            mesh.set_lighting(light_dir=self._light_direction, ambient_color=self._settings["ambient_color"], shininess=self._settings["shiness"])
+            self._meshes.append(mesh)
+            self._set_light()
+        return True
+
+    def is_clear(self):
+        return len(self._objects) == 0 and len(self._meshes) == 0
+
+    def get_all_bounds(self):  # return [(min, max) for each axis] in the scene coordinates. It does not depend on the mesh size, because only the raw box is mapped
+        if len(self._objects) == 0:  # the file is streamed now or the scene is empty
+            return self._stream_bounds.get_axes()
+        if self._scene_bounds is None:
+            raw_bounds = Bounds()
+            for obj in self._objects:
+                raw_bounds.extend_bounds(obj.get_raw_bounds())
+            self._scene_bounds = raw_bounds.get_axes(self._transform)
+        return self._scene_bounds
+
+    def get_objects_count(self):
+        return len(self._objects)
+
+    def get_object(self, index):
+        return self._objects[index]
+
+    def remove_object(self, index):
+        self._objects.pop(index).remove()
+        self._release_geometries(self._reads_count)
+        self._scene_bounds = None
+        self._is_center_changed = True
+        self._is_batches_changed = True
+        self.update_scene()
+
+    def set_object_overrides(self, index, overrides):  # overrides is the dictionary with render settings of this object only, for example {"poly_color": (1.0, 0.0, 0.0, 1.0)}
+        UPLOAD_COUNTER.start_operation("object overrides")
+        self._objects[index].set_overrides(overrides)
+        self._is_batches_changed = True
+        self.update_scene()  # the object can be moved to other merged object
+
+    def set_object_visible(self, index, is_visible):
+        UPLOAD_COUNTER.start_operation("object visibility")
+        obj = self._objects[index]
+        obj.set_visible(is_visible)
+        for batch in self._batches:
+            if obj in batch.get_members():
+                batch.update_members_visibility()
+
+    def _set_light(self):
+        for obj in self._objects + self._batches:
+            obj.set_light(self._light_direction)
+        for mesh in self._meshes:  # polygons visuals of the streamed file
+            mesh.set_lighting(light_dir=self._light_direction)
+
+    def _get_orientation_matrix(self, scale):
         if self._orientation == 0:
             # tr = np.array([[0, 1, 0], [0, 0, 1], [1, 0, 0]])
-            tr = np.array([[0, scale, 0], [0, 0, scale], [scale, 0, 0]])
-            return np.apply_along_axis(self._apply_transform, 1, array, tr, shift)
+            return np.array([[0, scale, 0], [0, 0, scale], [scale, 0, 0]])
         elif self._orientation == 1:
             # tr = np.array([[0, 0, 1], [1, 0, 0], [0, 1, 0]])
-            tr = np.array([[0, 0, scale], [scale, 0, 0], [0, scale, 0]])
-            return np.apply_along_axis(self._apply_transform, 1, array, tr, shift)
+            return np.array([[0, 0, scale], [scale, 0, 0], [0, scale, 0]])
         else:
-            tr = np.array([[scale, 0, 0], [0, scale, 0], [0, 0, scale]])
-            return np.apply_along_axis(self._apply_transform, 1, array, tr, shift)
-
-    def _create_mesh_datas(self, only_positions=False):
-        self._calc_positions = self._apply_orientation_to_values(self._raw_mesh_data[0], use_scale=True)
-        set_noramals = False
-        if only_positions is False:
-            if self._raw_mesh_data[3] is not None:
-                self._calc_normals = self._apply_orientation_to_values(self._raw_mesh_data[3], use_scale=False)
-                set_noramals = True
-        self._mesh_data = geometry.MeshData(vertices=self._calc_positions, faces=self._raw_mesh_data[1])
-        if set_noramals:
-            self._mesh_data._vertex_normals = self._calc_normals
-        self._edges_data = geometry.MeshData(vertices=self._calc_positions, faces=self._raw_mesh_data[2])
+            return np.array([[scale, 0, 0], [0, scale, 0], [0, 0, scale]])
+
+    def _get_bake_buffer(self, key, length):  # return reusable float32 buffer with at least length rows
+        buffer = self._bake_buffers.get(key)
+        if buffer is None or len(buffer) < length:
+            buffer = np.empty((length, 3), dtype=np.float32)
+            self._bake_buffers[key] = buffer
+        return buffer[:length]
+
+    def _apply_orientation_to_values(self, array, use_scale=False, shift=None, buffer_key=None):  # if buffer_key is defined, the result is written to the reusable buffer and valid only until the next call with the same key
+        scale = self._scale if use_scale else 1.0
+        if shift is None:
+            shift = self._center if use_scale and self._center_align and self._center is not None else [0.0, 0.0, 0.0]
+        tr = self._get_orientation_matrix(scale)
+        if buffer_key is None:
+            return transform_values(array, tr, shift)
+        return transform_values(array, tr, shift, out=self._get_bake_buffer(buffer_key, len(array)), temp=self._get_bake_buffer("temp", min(len(array), TRANSFORM_CHUNK_SIZE)))
+
+    def get_baked_positions(self, index=0):  # positions of the object in the scene coordinates, for export or picking
+        if index >= len(self._objects):
+            return None
+        return self._apply_orientation_to_values(self._objects[index].get_placed_positions(), use_scale=True, buffer_key="positions")
+
+    def get_baked_normals(self, index=0):
+        if index >= len(self._objects) or self._objects[index].get_mesh_data()[3] is None:
+            return None
+        return self._apply_orientation_to_values(self._objects[index].get_placed_normals(), use_scale=False, buffer_key="normals")
+
+    def update_culling(self):  # hide chunks outside of the camera frustum. Return True if the visibility is changed
+        is_changed = False
+        for obj in self._objects + self._batches:
+            is_changed = obj.update_culling() or is_changed
+        return is_changed
+
+    def get_visible_stats(self):  # return (visible chunks, all chunks, visible triangles) of all objects
+        stats = [obj.get_visible_stats() for obj in self._objects + self._batches]
+        return tuple([sum([s[i] for s in stats]) for i in range(3)])
 
-    def add_mesh_from_obj_file(self, file_path):
+    def get_draw_calls(self):  # the number of visible visuals, each of them is drawn by one call
+        return sum([obj.get_draw_calls() for obj in self._objects + self._batches]) + len([m for m in self._meshes if m.visible])
+
+    def get_render_stats(self):  # return the dictionary with counters of visible objects and the cost of the last built mesh data
+        objects = self._objects + self._batches
+        costs = [c for c in [obj.get_mesh_datas_cost() for obj in objects] if c is not None]
+        last_cost = max(costs, key=lambda c: c[2]) if len(costs) > 0 else None
+        return {"draw_calls": self.get_draw_calls(),
+                "triangles": self.get_visible_stats()[2] + sum([len(m.mesh_data.get_faces()) for m in self._meshes if m.visible]),
+                "points": sum([obj.get_visible_points() for obj in objects]),
+                "mesh_datas_time": last_cost[0] if last_cost is not None else None,
+                "mesh_datas_triangles": last_cost[1] if last_cost is not None else 0}
+
+    def add_mesh_from_obj_file(self, file_path, is_append=False, placement=None):
+        obj = self.set_mesh_data(file_path, self.read_mesh_data(file_path), is_append=is_append, placement=placement)
+        self.update_scene()
+        return obj
+
+    def begin_stream(self):  # remove the previous scene before the first streamed batch
         self.clear_scene()
-        # read the data
-        self._raw_mesh_data = self._read_obj(file_path)  # (np.array(vertices_list), np.array(faces_list), np.array(edges_list), np.array(normals_list))
-        # next create mesh-data objects
-        self._create_mesh_datas()
-        
-        # next add meshes to the scene
-        self._add_polygons()
-        self._add_edges()
-        self._add_points()
-        self._set_light()
+
+    def _get_read_index(self, mesh_data):
+        with self._geometries_lock:
+            for entry in self._geometries:
+                if entry[5] is mesh_data:
+                    return entry[4]
+        return None
+
+    def _get_instance_source(self, mesh_data):  # return the first object with the same mesh data or None
+        for obj in self._objects:
+            if obj.get_mesh_data() is mesh_data:
+                return obj
+        return None
+
+    def set_mesh_data(self, file_path, mesh_data, is_append=False, overrides=None, placement=None):  # mesh_data is the output of read_mesh_data. placement is the 4x4 matrix of the object (for row vectors) or None. Return the new SceneObject. The center is updated and small objects are shown by update_scene
+        UPLOAD_COUNTER.start_operation("load")
+        if not is_append:
+            self.clear_scene(self._get_read_index(mesh_data))
+        self._add_geometry(file_path, mesh_data)
+        # objects with the same mesh data are instances of one geometry, they are placed by own matrices
+        obj = SceneObject(file_path, mesh_data, self._settings, scene=self._scene, transform=self._transform, is_welded=self._weld_vertices, overrides=overrides, placement=placement, source=self._get_instance_source(mesh_data))
+        self._objects.append(obj)
+        self._scene_bounds = None
+        self._is_center_changed = True
+        self._is_batches_changed = True
+        obj.set_light(self._light_direction)
+        obj.start_background(self._lod_executor, build_lods=self._build_lods, build_picking=self._build_picking)
+        if not (self._merge_small and obj.is_mergeable()):
+            obj.add_visuals()
+        return obj
+
+    def _get_any_visual(self):
+        for obj in self._objects + self._batches:
+            visuals = obj.get_visuals()
+            if len(visuals) > 0:
+                return visuals[0]
+        return self._meshes[0] if len(self._meshes) > 0 else None
+
+    def unproject(self, canvas_position, depth):  # return the scene position of the canvas point with the depth buffer value (0 is the near plane, 1 is the far plane) or None
+        visual = self._get_any_visual()
+        if visual is None:
+            return None
+        position = visual.get_transform("canvas", "scene").map([canvas_position[0], canvas_position[1], 2.0 * depth - 1.0, 1.0])
+        return position[:3] / position[3]
+
+    def is_picking_ready(self):  # objects without the picking structure are skipped by pick, it is built in the background
+        return all([obj.get_bvh() is not None for obj in self._objects])
+
+    def pick(self, canvas_position):  # return (object index, triangle index, closest vertex index, closest edge (vertex, vertex), position in the scene coordinates) under the canvas point or None
+        near = self.unproject(canvas_position, 0.0)
+        far = self.unproject(canvas_position, 1.0)
+        if near is None or len(self._objects) == 0:
+            return None
+        # trees are built for raw positions, so the ray is mapped to the raw space and orientation or scale changes do not need the refit
+        origin = self._transform.imap(near)
+        origin = origin[:3] / origin[3]
+        end = self._transform.imap(far)
+        direction = end[:3] / end[3] - origin
+        result = None
+        for i in range(len(self._objects)):
+            hit = self._objects[i].pick(origin, direction)
+            if hit is not None and (result is None or hit[0] < result[0]):
+                result = (hit[0], i) + hit[1:]
+        if result is None:
+            return None
+        position = self._transform.map(result[5])
+        return result[1:5] + (position[:3] / position[3],)
+
+    def is_lods_building(self):
+        return any([obj.is_lods_building() for obj in self._objects])
+
+    def update_lod(self, canvas_size, camera_position, fov):  # select levels of detail of all objects, return True if any level is changed
+        is_changed = False
+        for obj in self._objects:
+            is_changed = obj.update_lod(canvas_size, camera_position, fov) or is_changed
+        if is_changed:  # new levels are uploaded when they are drawn
+            UPLOAD_COUNTER.start_operation("levels of detail")
+        return is_changed
+
+    def pop_lod_errors(self):  # return the list of (file path, message) of objects, which levels of detail are failed after the last call
+        errors = [(obj.get_file_path(), obj.pop_lod_error()) for obj in self._objects]
+        return [e for e in errors if e[1] is not None]
+
+    def get_restore_delay(self):
+        return self._settings["restore_delay"]
+
+    def set_interaction(self, is_active):  # while the camera is moved, hide points and edges and draw the coarsest level of detail. Return True if the scene is changed
+        if is_active == self._is_interaction or (is_active and not self._settings["reduce_quality"]):
+            return False
+        self._is_interaction = is_active
+        UPLOAD_COUNTER.start_operation("interaction")
+        is_changed = False
+        for obj in self._objects + self._batches:
+            is_changed = obj.set_interaction(is_active) or is_changed
+        return is_changed
 
     def _get_value(self, params, key):
         for p in params:
@@ -305,61 +1195,33 @@ class SceneObjects(object):
         return [color[i] / 255.0 for i in range(len(color))]
 
     def _save_render_settings(self, params):
-        line_width = self._get_value(params, "line_width")
-        if line_width is not None:
-            self._settings_line_width = line_width
-        show_faces = self._get_value(params, "show_faces")
-        if show_faces is not None:
-            self._settings_show_faces = show_faces
-        show_edges = self._get_value(params, "show_edges")
-        if show_edges is not None:
-            self._settings_show_wire = show_edges
-        show_points = self._get_value(params, "show_points")
-        if show_points is not None:
-            self._settinge_show_points = show_points
-        poly_color = self._get_value(params, "poly_color")
-        if poly_color is not None:
-            self._settings_color = self._color_to_float(poly_color)
-        edge_color = self._get_value(params, "edge_color")
-        if edge_color is not None:
-            self._settings_edge_color = self._color_to_float(edge_color)
-        point_color = self._get_value(params, "point_color")
-        if point_color is not None:
-            self._settings_point_color = self._color_to_float(point_color)
-        shiness = self._get_value(params, "shiness")
-        if point_color is not None:
-            self._settings_shiness = shiness
-        point_size = self._get_value(params, "point_size")
-        if point_size is not None:
-            self._settings_point_size = point_size
-        ambient_color = self._get_value(params, "ambient_color")
-        if ambient_color is not None:
-            self._settings_ambient_color = self._color_to_float(ambient_color)
-        light_color = self._get_value(params, "light_color")
-        if light_color is not None:
-            self._settings_light_color = self._color_to_float(light_color)
-        light_intensity = self._get_value(params, "light_intensity")
-        if light_intensity is not None:
-            self._settings_light_intensity = light_intensity
-        light_shift_x = self._get_value(params, "light_shift_x")
-        light_shift_y = self._get_value(params, "light_shift_y")
-        if light_shift_x is not None:
-            self._light_shift_x = light_shift_x
-        if light_shift_y is not None:
-            self._light_shift_y = light_shift_y
-
-    def apply_render_settings(self, params=None, changed_param=""):
+        for key in self._settings:
+            value = self._get_value(params, key)
+            if value is not None:
+                self._settings[key] = self._color_to_float(value) if key.endswith("_color") else value
+
+    def get_upload_stats(self):  # return the dictionary operation name -> (uploaded buffers, bytes)
+        return UPLOAD_COUNTER.get_operations()
+
+    def apply_render_settings(self, params=None, changed_param=""):  # settings are shared by all objects, so each change is one pass over the registry
+        UPLOAD_COUNTER.start_operation("render settings")
         self._save_render_settings(params)
         if changed_param in ["show_faces", "ambient_color", "shiness", "poly_color"]:
-            self._update_polygons()
-        elif changed_param in ["show_edges", "edge_color", "line_width"]:
-            self._update_edges()
+            for obj in self._objects + self._batches:
+                obj.update_polygons()
+        elif changed_param in ["show_edges", "shader_wireframe", "edge_color", "line_width"]:
+            for obj in self._objects + self._batches:
+                obj.update_edges()
         elif changed_param in ["show_points", "point_size", "point_color"]:
-            self._update_points()
+            for obj in self._objects + self._batches:
+                obj.update_points()
         elif changed_param in ["light_shift_x", "light_shift_y", "light_shift_z"]:
             self.update_camera_callback(self._view.camera.center, self._view.camera.get_position())
         else:  # light_color and light_intensity are not implemented in MeshVisual
             pass
+        if changed_param in MATERIAL_SETTINGS:  # objects with overrides can be grouped in other way
+            self._is_batches_changed = True
+            self.update_scene()
 
     def _cross(self, a, b):
         return (a[1]*b[2] - a[2]*b[1], -a[0]*b[2] + a[2]*b[0], a[0]*b[1] - a[1]*b[0])
@@ -389,7 +1251,7 @@ class SceneObjects(object):
         up_vector = (0.0, 0.0, 1.0)
         x_side = self._normalize(self._cross(to_vector, up_vector))
         y_side = self._normalize(self._cross(x_side, to_vector))
-        light_shift = self._add_vectors(self._scale_vector(self._light_shift_x, x_side), self._scale_vector(self._light_shift_y, y_side))
+        light_shift = self._add_vectors(self._scale_vector(self._settings["light_shift_x"], x_side), self._scale_vector(self._settings["light_shift_y"], y_side))
         self._light_direction = ([camera[i] + light_shift[i] - center[i] for i in range(3)])
         self._set_light()
 
@@ -402,6 +1264,7 @@ class SceneProperties(object):
         self._visuals = SceneVisuals(scene=scene)  # here we store grid, axis and so on
         self._grid_exist = False
         self._axis_exist = False
+        self._stats_exist = False
 
     def _get_value(self, params, key):
         for p in params:
@@ -423,6 +1286,19 @@ class SceneProperties(object):
     def update_visuals(self, canvas_size, camera):
         self._visuals.update(canvas_size, camera)
 
+    def show_render_stats(self, is_show):  # the text is drawn over the scene in the left top corner of the view
+        if is_show and not self._stats_exist:
+            self._visuals.add_stats_text(self._view)
+        elif not is_show:
+            self._visuals.remove_stats_text()
+        self._stats_exist = is_show
+
+    def set_render_stats(self, lines):
+        self._visuals.set_stats_text(lines)
+
+    def get_draw_calls(self):
+        return self._visuals.get_draw_calls()
+
     def apply(self, params=None):
         if params is not None:
             # upper axis
@@ -541,11 +1417,13 @@ class SceneCameras(object):
 
 
 class CameraPerspective(scene.cameras.TurntableCamera):
-    def __init__(self, key_controller=None, on_changed=None, fov=60.0, elevation=30.0, azimuth=90.0, distance=2.5, parent_scene=None, **kwargs):
+    def __init__(self, key_controller=None, on_changed=None, on_interaction=None, fov=60.0, elevation=30.0, azimuth=90.0, distance=2.5, parent_scene=None, **kwargs):
         super(CameraPerspective, self).__init__(fov=fov, elevation=elevation, azimuth=azimuth, distance=distance, **kwargs)
         # self._active = True
         self._scene = parent_scene
         self._on_changed = on_changed
+        self._on_interaction = on_interaction  # called as on_interaction(is_active) when the mouse drag of the camera is started and finished
+        self._is_interaction = False
         self._current_symbols = []
         self._current_keys = KeyClass()  # store last pressed keys
         if key_controller is not None:
@@ -580,6 +1458,10 @@ class CameraPerspective(scene.cameras.TurntableCamera):
             return
         if event.type == "mouse_release":
             self._event_value = None
+            if self._is_interaction:
+                self._is_interaction = False
+                if self._on_interaction is not None:
+                    self._on_interaction(False)
         elif event.type == "mouse_press":
             event.handled = True
         elif event.type == "mouse_move":
@@ -622,4 +1504,8 @@ class CameraPerspective(scene.cameras.TurntableCamera):
                 self.view_changed()
                 should_update = True
         if should_update:
+            if not self._is_interaction:
+                self._is_interaction = True
+                if self._on_interaction is not None:
+                    self._on_interaction(True)
             self._on_changed()
\ No newline at end of file
@@ -1,24 +1,81 @@
 import os
-from vispy import scene
-from canvas.canvas_items import SceneObjects, SceneProperties, SceneCameras, CameraPerspective
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from vispy import scene, app, gloo
+from canvas.canvas_items import SceneObjects, SceneProperties, SceneCameras, CameraPerspective, MESH_DATA_VERSION
+from canvas.canvas_visuals import UPLOAD_COUNTER, FrameTimer
+from helpers.mesh_cache import MeshCache
+from helpers.obj_loader import LoadCancelled
+
+
+class MeshLoadingTask(object):  # the state of one background loading. Progress values are written by the worker thread and read by the main thread
+    def __init__(self, file_path, progress_callback=None, finished_callback=None, is_progressive=False, is_append=False, placement=None):
+        self.file_path = file_path
+        self.is_append = is_append  # add the mesh to the scene instead of replacing it
+        self.placement = placement  # the 4x4 matrix of the object or None
+        self.progress_callback = progress_callback  # called in the main thread as progress_callback(bytes_read, total_bytes)
+        self.finished_callback = finished_callback  # called in the main thread as finished_callback(is_loaded)
+        self.future = None
+        self.bytes_read = 0
+        self.total_bytes = 0
+        self.is_cancelled = False
+        self.batches = queue.Queue() if is_progressive else None  # parsed faces for progressive display
+        self.is_stream_started = False
+
+    def on_batch(self, batch):  # called from the worker thread
+        if self.is_cancelled:
+            raise LoadCancelled()
+        self.batches.put(batch)
+
+    def on_progress(self, bytes_read, total_bytes):  # called from the worker thread
+        self.bytes_read = bytes_read
+        self.total_bytes = total_bytes
+        if self.is_cancelled:
+            raise LoadCancelled()
 
 
 class Canvas(scene.SceneCanvas):
-    def __init__(self, key_controller=None, host_press_event=None, host_release_event=None, scene_properties=None, render_parameters=None):
-        scene.SceneCanvas.__init__(self, keys=None, vsync=False)
+    def __init__(self, key_controller=None, host_press_event=None, host_release_event=None, scene_properties=None, render_parameters=None, cache_dir=None, cache_size=2 * 1024 * 1024 * 1024, loader_workers=1, size=(800, 600), build_picking=True, pick_callback=None, error_callback=None):
+        scene.SceneCanvas.__init__(self, keys=None, vsync=False, size=size)
         self.unfreeze()
         self._key_controller = key_controller
         self._host_press_event = host_press_event
         self._host_release_event = host_release_event
+        self._error_callback = error_callback  # called in the main thread as error_callback(message), when the file is not loaded or its levels of detail are not built. Messages are printed, if it is not set
+        self._pick_callback = pick_callback  # called in the main thread as pick_callback(result) after the click, result is the same as the pick method returns
         self._cameras = SceneCameras()
         self.view = self.central_widget.add_view()
         self._objects = SceneObjects(parent_view=self.view,
                                      render_settings=render_parameters,
                                      orientation=self._get_param_value(scene_properties, "up_axis")[0],
                                      scale=self._get_param_value(scene_properties, "scale"),
-                                     is_centering=self._get_param_value(scene_properties, "center"))
+                                     is_centering=self._get_param_value(scene_properties, "center"),
+                                     weld_vertices=self._get_param_value(scene_properties, "weld_vertices"),
+                                     mesh_cache=MeshCache(cache_dir, max_size=cache_size, version=MESH_DATA_VERSION) if cache_dir is not None else None,
+                                     loader_workers=loader_workers,
+                                     build_lods=self._get_param_value(scene_properties, "levels_of_detail"),
+                                     merge_small_meshes=self._get_param_value(scene_properties, "merge_small_meshes"),
+                                     normals_weighting=self._get_param_value(scene_properties, "normals_weighting")[0],
+                                     crease_angle=self._get_param_value(scene_properties, "crease_angle"),
+                                     build_picking=build_picking)
         self._scene_properties = SceneProperties(canvas=self, view=self.view, scene=self.view.scene)
+        # meshes are loaded in the worker thread, the timer check the loading state in the main thread
+        self._loading_executor = ThreadPoolExecutor(max_workers=1)
+        self._loading_tasks = []
+        self._loading_timer = app.Timer(0.05, connect=self._check_loading, app=self.app)
+        self._progressive_loading = self._get_param_value(scene_properties, "progressive_loading")  # show faces while the file is loaded
+        self._interaction_timer = app.Timer(connect=self._restore_quality, iterations=1, app=self.app)  # restore the full quality after the camera is stopped
+        self._pivot_request = None  # the canvas point of the double click, the depth under it is read after the next draw
+        self._frame_uploads = (0, 0)  # (buffers, bytes) uploaded by the last drawn frame
+        # render statistics of the last frame, the overlay text is refreshed by the timer, because each change of the text redraws the canvas
+        self._frame_timer = FrameTimer()
+        self._stats_frames = 0  # frames drawn after the last refresh of the overlay
+        self._stats_timer = app.Timer(0.5, connect=self._refresh_render_stats, app=self.app)
         self.freeze()
+        self.events.draw.connect(self._begin_frame, position="first")
+        self.events.draw.connect(self._set_pivot_from_depth, position="last")
+        self.events.draw.connect(self._collect_uploads, position="last")
+        self.events.draw.connect(self._end_frame, position="last")
 
         # self._clear_scene()  # <-------- turn on!!!
 
@@ -26,6 +83,7 @@ class Canvas(scene.SceneCanvas):
         self._cameras.add_camera(CameraPerspective(key_controller=key_controller,
                                                    name="Perspective camera",
                                                    on_changed=self.on_camera_changed,
+                                                   on_interaction=self.on_camera_interaction,
                                                    parent_scene=self.view.scene,
                                                    fov=self._get_param_value(scene_properties, "camera_fov")))
         # connect camera to the view
@@ -49,16 +107,156 @@ class Canvas(scene.SceneCanvas):
             self._cameras.current_camera.make_active()
             self._scene_properties.update_visuals(self.size, self._cameras.current_camera)
 
-    def add_mesh_from_file(self, file_path):
+    def add_mesh_from_file(self, file_path, asynchronous=False, progress_callback=None, finished_callback=None, is_append=False, placement=None):  # if is_append is True, the mesh is added to the scene, otherwise it replaces the scene
+        # placement is the 4x4 matrix of the object for row vectors, copies of one file are stored once and drawn as instances with own placements
         if os.path.isfile(file_path):
             ext = os.path.splitext(file_path)[1]
             if ext == ".obj" or ext == ".OBJ":
-                self._objects.add_mesh_from_obj_file(file_path)
+                if asynchronous:
+                    if not is_append:  # the new file replace the scene, so previous loadings are not needed
+                        self.cancel_loading()
+                    # only the replacing file is streamed, because streamed faces are shown instead of the whole scene
+                    task = MeshLoadingTask(file_path, progress_callback=progress_callback, finished_callback=finished_callback, is_progressive=self._progressive_loading and not is_append, is_append=is_append, placement=placement)
+                    task.future = self._loading_executor.submit(self._objects.read_mesh_data, file_path, task.on_progress, task.on_batch if task.batches is not None else None)
+                    self._loading_tasks.append(task)
+                    if not self._loading_timer.running:
+                        self._loading_timer.start()
+                else:
+                    self._objects.add_mesh_from_obj_file(file_path, is_append=is_append, placement=placement)
+                    self._start_lods_waiting()
             else:
                 print("Only *.obj file can be opened")
         else:
             print("There is not file " + file_path)
 
+    def cancel_loading(self):
+        for task in self._loading_tasks:
+            task.is_cancelled = True
+
+    def is_loading(self):
+        return len(self._loading_tasks) > 0
+
+    def _start_lods_waiting(self):  # levels of detail are built in the background, the timer applies them when they are ready
+        if self._objects.is_lods_building() and not self._loading_timer.running:
+            self._loading_timer.start()
+
+    def _update_lod(self):
+        camera = self._cameras.current_camera
+        if self._objects.update_lod(self.size, camera.get_position(), camera.fov):
+            self._objects.update_culling()  # new visuals are visible
+            self.update()
+        for (file_path, error) in self._objects.pop_lod_errors():  # the object is drawn by the full mesh
+            self._report_error("Fail to build levels of detail of " + file_path + ": " + error)
+
+    def _report_error(self, message):
+        if self._error_callback is not None:
+            self._error_callback(message)
+        else:
+            print(message)
+
+    def get_visible_stats(self):  # return (visible chunks, all chunks, visible triangles)
+        return self._objects.get_visible_stats()
+
+    def get_draw_calls(self):
+        return self._objects.get_draw_calls()
+
+    def get_upload_stats(self):  # return the dictionary operation name -> (uploaded buffers, bytes)
+        return self._objects.get_upload_stats()
+
+    def _collect_uploads(self, event=None):  # buffers are uploaded when the frame is drawn, totals of operations are returned by get_upload_stats
+        self._frame_uploads = UPLOAD_COUNTER.pop_frame()
+
+    def _begin_frame(self, event=None):
+        self._frame_timer.begin_frame()
+
+    def _end_frame(self, event=None):
+        self._frame_timer.end_frame()
+        self._stats_frames += 1
+
+    def get_render_stats(self):  # return the dictionary with statistics of the last frame, times are in seconds, GPU time is None if timer queries are not supported
+        stats = self._objects.get_render_stats()
+        stats["draw_calls"] += self._scene_properties.get_draw_calls()
+        stats["cpu_time"] = self._frame_timer.get_cpu_time()
+        stats["gpu_time"] = self._frame_timer.get_gpu_time()
+        (stats["uploads"], stats["uploaded_bytes"]) = self._frame_uploads
+        return stats
+
+    def show_render_stats(self, is_show):
+        self._scene_properties.show_render_stats(is_show)
+        if is_show:
+            self._stats_frames = 1  # show values of the last frame at once
+            self._refresh_render_stats()
+            self._stats_timer.start()
+        else:
+            self._stats_timer.stop()
+        self.update()
+
+    def _refresh_render_stats(self, event=None):
+        if self._stats_frames == 0:  # nothing is drawn except the previous refresh
+            return
+        stats = self.get_render_stats()
+
+        def milliseconds(value):
+            return "%.2f ms" % (value * 1000.0) if value is not None else "n/a"
+        lines = ["CPU frame: " + milliseconds(stats["cpu_time"]),
+                 "GPU frame: " + milliseconds(stats["gpu_time"]),
+                 "Draw calls: %d" % stats["draw_calls"],
+                 "Triangles: %d" % stats["triangles"],
+                 "Points: %d" % stats["points"],
+                 "Uploaded: %d buffers, %.2f Mb" % (stats["uploads"], stats["uploaded_bytes"] / (1024.0 * 1024.0)),
+                 "Mesh data: " + milliseconds(stats["mesh_datas_time"]) + (" (%d triangles)" % stats["mesh_datas_triangles"] if stats["mesh_datas_time"] is not None else "")]
+        self._scene_properties.set_render_stats(lines)
+        self._stats_frames = -1  # the frame drawn after the change of the text is not counted
+
+    def _show_stream(self, task):  # add parsed faces to the scene and frame them
+        is_changed = False
+        while not task.is_cancelled:
+            try:
+                batch = task.batches.get_nowait()
+            except queue.Empty:
+                break
+            if not task.is_stream_started:
+                self._objects.begin_stream()
+                task.is_stream_started = True
+            is_changed = self._objects.add_stream_batch(batch) or is_changed
+        if is_changed:
+            self.command_fix_area()
+            self.update()
+
+    def _check_loading(self, event=None):  # called by the timer in the main thread
+        while len(self._loading_tasks) > 0:
+            task = self._loading_tasks[0]
+            if task.batches is not None:
+                self._show_stream(task)
+            if not task.future.done():
+                if task.progress_callback is not None and not task.is_cancelled:
+                    task.progress_callback(task.bytes_read, task.total_bytes)
+                if self._objects.update_scene():  # update the center and merge objects loaded by this call
+                    self.update()
+                return
+            self._loading_tasks.pop(0)
+            is_loaded = False
+            try:
+                mesh_data = task.future.result()
+                if not task.is_cancelled:
+                    self._objects.set_mesh_data(task.file_path, mesh_data, is_append=task.is_append, placement=task.placement)
+                    is_loaded = True
+                    self.update()
+            except LoadCancelled:
+                if task.is_stream_started:  # the previous scene is already removed, so remove the partial one too
+                    self._objects.clear_scene()
+            except Exception as error:
+                self._report_error("Fail to load the file " + task.file_path + ": " + str(error))
+            if task.finished_callback is not None:
+                task.finished_callback(is_loaded)
+        if self._objects.update_scene():
+            self.update()
+        if self._objects.is_lods_building():
+            self._update_lod()  # select the level, when they are built
+            if self._objects.is_lods_building():
+                return
+        self._loading_timer.stop()
+
     # --------------Technical functions---------------------
     def _clear_scene(self):
         count = len(self.view.scene.children)
@@ -77,15 +275,67 @@ class Canvas(scene.SceneCanvas):
     def on_camera_changed(self):  # this method called by camera instance when it change position
         self._scene_properties.update_visuals(self.size, self._cameras.current_camera)
         self._objects.update_camera_callback(self._cameras.current_camera.get_center(), self._cameras.current_camera.get_position())
+        self._update_lod()
+        self._objects.update_culling()
+
+    def on_camera_interaction(self, is_active):  # called by the camera when the mouse drag is started and finished
+        if is_active:
+            self._interaction_timer.stop()
+            if self._objects.set_interaction(True):
+                self.update()
+        else:
+            self._interaction_timer.interval = self._objects.get_restore_delay() / 1000.0
+            self._interaction_timer.start()
+
+    def _restore_quality(self, event=None):
+        if self._objects.set_interaction(False):
+            self.update()
 
     def on_mouse_press(self, event):
         pass
 
     def on_mouse_release(self, event):
-        pass
+        if event.button == 1 and event.press_event is not None and abs(event.pos - event.press_event.pos).max() <= 2:  # the click without the camera drag
+            self.pick(event.pos)
+
+    def pick(self, canvas_position):  # return the same as SceneObjects.pick and pass it to the pick callback
+        result = self._objects.pick(canvas_position)
+        if self._pick_callback is not None:
+            self._pick_callback(result)
+        return result
+
+    def is_picking_ready(self):  # False while picking structures of some objects are built, these objects can not be picked
+        return self._objects.is_picking_ready()
+
+    def get_object_file_path(self, index):
+        return self._objects.get_object(index).get_file_path()
 
     def on_mouse_double_click(self, event):
-        pass
+        if event.button == 1:
+            self._pivot_request = event.pos
+            self.update()
+
+    def _read_depth(self, canvas_position, radius=2):  # return the nearest depth in the small square around the canvas point or None for the background. Should be called before buffers are swapped
+        (width, height) = self.physical_size
+        x = int(canvas_position[0] * self.pixel_scale)
+        y = height - 1 - int(canvas_position[1] * self.pixel_scale)  # the framebuffer starts from the bottom
+        (x_min, y_min, x_max, y_max) = (max(x - radius, 0), max(y - radius, 0), min(x + radius + 1, width), min(y + radius + 1, height))
+        if x_max <= x_min or y_max <= y_min:
+            return None
+        depth = gloo.read_pixels(viewport=(x_min, y_min, x_max - x_min, y_max - y_min), mode="depth", out_type="float")
+        depth = depth[depth < 1.0]
+        return float(depth.min()) if len(depth) > 0 else None
+
+    def _set_pivot_from_depth(self, event=None):  # called after the scene is drawn, so the depth buffer is valid
+        if self._pivot_request is None:
+            return
+        canvas_position = self._pivot_request
+        self._pivot_request = None
+        depth = self._read_depth(canvas_position)
+        center = self._objects.unproject(canvas_position, depth) if depth is not None else None
+        if center is not None:
+            self._cameras.current_camera.center = tuple(center)
+            self.on_camera_changed()
 
     def on_mouse_move(self, event):
         pass
@@ -113,6 +363,7 @@ class Canvas(scene.SceneCanvas):
     def on_resize(self, event):
         scene.SceneCanvas.on_resize(self, event)
         self._scene_properties.update_visuals(self.size, self._cameras.current_camera)
+        self._objects.update_culling()
 
     # ---------Host application callbacks------------------
     def properties_change(self, params=None, changed_name=None, old_value=None, new_value=None, type=None):  # the host should call this method when user change any of properties parameters
@@ -124,6 +375,22 @@ class Canvas(scene.SceneCanvas):
             self._objects.set_scale(new_value)
         elif changed_name == "center":
             self._objects.set_centering(new_value)
+        elif changed_name == "progressive_loading":
+            self._progressive_loading = new_value
+        elif changed_name == "weld_vertices":
+            self._objects.set_weld_vertices(new_value)
+            self._start_lods_waiting()
+        elif changed_name == "normals_weighting":
+            self._objects.set_normals_weighting(new_value[0])
+            self._start_lods_waiting()
+        elif changed_name == "crease_angle":
+            self._objects.set_crease_angle(new_value)
+            self._start_lods_waiting()
+        elif changed_name == "levels_of_detail":
+            self._objects.set_build_lods(new_value)
+            self._start_lods_waiting()
+        elif changed_name == "merge_small_meshes":
+            self._objects.set_merge_small_meshes(new_value)
         elif changed_name == "camera_fov":
             self._cameras.current_camera.set_fov(new_value)
 
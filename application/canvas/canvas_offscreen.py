@@ -0,0 +1,80 @@
+import os
+import time
+import vispy
+from vispy import io
+from canvas.canvas_main import Canvas
+from interaction.keys import KeyController
+from helpers.read_data import read_scene_properties_from_file, read_render_settings_from_file, get_data_path
+
+OFFSCREEN_BACKENDS = ("egl", "osmesa")  # vispy applications which draw without the display, in the order of trying
+
+
+def use_offscreen_backend(backend=None):  # select the vispy application without windows, should be called before the canvas is created. Return the name of the backend
+    errors = []
+    for name in ([backend] if backend is not None else OFFSCREEN_BACKENDS):
+        try:
+            vispy.use(app=name)
+            return name
+        except Exception as error:  # the library of the backend is not installed or it can not create the context
+            errors.append("%s: %s" % (name, str(error).strip()))
+    raise RuntimeError("Offscreen rendering is not available (" + "; ".join(errors) + ")")
+
+
+def find_obj_files(paths):  # return OBJ files from the list of files and folders, folders are searched recursively
+    to_return = []
+    for path in paths:
+        if os.path.isdir(path):
+            for (folder, folders, files) in os.walk(path):
+                folders.sort()
+                to_return.extend([os.path.join(folder, f) for f in sorted(files) if os.path.splitext(f)[1] in (".obj", ".OBJ")])
+        else:
+            to_return.append(path)
+    return to_return
+
+
+class ThumbnailRenderer(object):
+    '''Draws OBJ files to PNG images by the canvas without the window. The canvas, its GL context and shaders are created once,
+    each file replaces the scene, so the cost of the file is the loading and one frame.'''
+    def __init__(self, size=(256, 256), backend=None, show_grid=False, show_axis=False, cache_dir=None, cache_size=2 * 1024 * 1024 * 1024, loader_workers=1):
+        self._backend = use_offscreen_backend(backend)
+        self._size = tuple(size)
+        scene_properties = read_scene_properties_from_file(get_data_path("scene_properties.xml"), None)
+        # levels of detail and streaming are used only while the camera is moved or the file is loaded in the window
+        scene_properties.set_value("levels_of_detail", False)
+        scene_properties.set_value("progressive_loading", False)
+        scene_properties.set_value("show_grid", show_grid)
+        scene_properties.set_value("show_axis", show_axis)
+        render_settings = read_render_settings_from_file(get_data_path("render_settings.xml"), None)
+        self._canvas = Canvas(key_controller=KeyController(),
+                              scene_properties=scene_properties.get_parameters(),
+                              render_parameters=render_settings.get_parameters(),
+                              cache_dir=cache_dir,
+                              cache_size=cache_size,
+                              loader_workers=loader_workers,
+                              size=self._size,
+                              build_picking=False)
+
+    def get_backend(self):
+        return self._backend
+
+    def render(self, file_path, output_path, size=None):  # return (load seconds, render seconds) or None, if the file is not loaded
+        if not os.path.isfile(file_path):
+            print("There is not file " + file_path)
+            return None
+        if os.path.splitext(file_path)[1] not in (".obj", ".OBJ"):  # otherwise the canvas keeps the previous scene
+            print("Only *.obj file can be opened")
+            return None
+        size = tuple(size) if size is not None else self._size
+        if tuple(self._canvas.size) != size:
+            self._canvas.size = size
+        start = time.perf_counter()
+        self._canvas.add_mesh_from_file(file_path)
+        loaded = time.perf_counter()
+        self._canvas.command_fix_area()
+        image = self._canvas.render(size=size)
+        io.write_png(output_path, image)
+        return (loaded - start, time.perf_counter() - loaded)
+
+    def close(self):
+        self._canvas.command_clear_scene()
+        self._canvas.close()
@@ -1,11 +1,107 @@
 import numpy as np
 import math
+import time
 
 from vispy.visuals.visual import CompoundVisual
 from vispy.visuals.line import LineVisual
+from vispy.visuals.mesh import MeshVisual
 from vispy.color import Color
 from vispy import scene
 from vispy.visuals.transforms import MatrixTransform
+from vispy.visuals.filters import Filter
+from vispy.visuals.shaders import Function
+from vispy.gloo import VertexBuffer
+from vispy.gloo.buffer import DataBuffer
+try:  # timer queries are not a part of OpenGL ES 2, so vispy does not wrap them
+    from OpenGL import GL
+except ImportError:
+    GL = None
+
+
+class UploadCounter(object):
+    '''Counts buffers uploaded to the GPU and their bytes. Visuals upload buffers when they are drawn, not when their data is set,
+    so uploads are added to the last started operation. Frame values are counted from the last call of pop_frame.'''
+    def __init__(self):
+        self._operation = "start"
+        self._operations = {}  # operation name -> [uploads, bytes]
+        self._frame = [0, 0]
+
+    def start_operation(self, name):
+        self._operation = name
+
+    def get_operation(self):
+        return self._operation
+
+    def add(self, nbytes):
+        stats = self._operations.setdefault(self._operation, [0, 0])
+        stats[0] += 1
+        stats[1] += nbytes
+        self._frame[0] += 1
+        self._frame[1] += nbytes
+
+    def pop_frame(self):  # return (uploads, bytes) since the previous call
+        frame = tuple(self._frame)
+        self._frame = [0, 0]
+        return frame
+
+    def get_operations(self):  # return the dictionary operation name -> (uploads, bytes)
+        return dict([(name, tuple(stats)) for (name, stats) in self._operations.items()])
+
+
+UPLOAD_COUNTER = UploadCounter()  # all visuals are drawn in one GL context, so the counter is shared
+
+
+class FrameTimer(object):
+    '''CPU and GPU time of the last drawn frame. The GPU time is measured by timer queries, it needs PyOpenGL and OpenGL 3.3, otherwise it is None.
+    Results of queries are read a few frames later, when they are available, so the render does not wait for the GPU.'''
+    def __init__(self, queries_count=4):
+        self._queries_count = queries_count
+        self._is_gpu_timer = GL is not None
+        self._free_queries = None  # created in the first frame, when the context is current
+        self._ended_queries = []
+        self._query = None  # the query of the current frame
+        self._start = None
+        self._cpu_time = None
+        self._gpu_time = None
+
+    def begin_frame(self):
+        self._start = time.perf_counter()
+        if self._is_gpu_timer:
+            try:
+                if self._free_queries is None:
+                    self._free_queries = [int(q) for q in np.atleast_1d(GL.glGenQueries(self._queries_count))]
+                self._read_queries()
+                if len(self._free_queries) > 0:  # otherwise the GPU is behind by several frames, this frame is not measured
+                    self._query = self._free_queries.pop()
+                    GL.glBeginQuery(GL.GL_TIME_ELAPSED, self._query)
+            except Exception:  # the context without timer queries
+                self._is_gpu_timer = False
+                self._query = None
+
+    def end_frame(self):
+        if self._start is None:
+            return
+        if self._query is not None:
+            try:
+                GL.glEndQuery(GL.GL_TIME_ELAPSED)
+                self._ended_queries.append(self._query)
+            except Exception:
+                self._is_gpu_timer = False
+            self._query = None
+        self._cpu_time = time.perf_counter() - self._start
+        self._start = None
+
+    def _read_queries(self):
+        while len(self._ended_queries) > 0 and GL.glGetQueryObjectiv(self._ended_queries[0], GL.GL_QUERY_RESULT_AVAILABLE):
+            query = self._ended_queries.pop(0)
+            self._gpu_time = int(GL.glGetQueryObjectui64v(query, GL.GL_QUERY_RESULT)) * 1e-9
+            self._free_queries.append(query)
+
+    def get_cpu_time(self):  # seconds of the last frame or None
+        return self._cpu_time
+
+    def get_gpu_time(self):  # seconds of the last measured frame or None
+        return self._gpu_time if self._is_gpu_timer else None
 
 
 class GridVisual(LineVisual):
@@ -79,7 +175,128 @@ class NullVisual(LineVisual):
         LineVisual.__init__(self, pos=verts, color=color, connect='segments', method="gl", **kwargs)
 
 
+wireframe_vertex_template = """
+varying vec3 v_wire_bc;
+
+void prepare_wireframe() {
+    v_wire_bc = $bc;
+}
+"""
+
+wireframe_fragment_template = """
+varying vec3 v_wire_bc;
+
+void draw_wireframe() {
+    if ($enabled != 1) {
+        return;
+    }
+    vec3 d = fwidth(v_wire_bc);
+    vec3 fading = smoothstep(vec3(0.0), $width * d, v_wire_bc);
+    float opacity = 1.0 - min(min(fading.x, fading.y), fading.z);
+    gl_FragColor = mix(gl_FragColor, $color, opacity);
+}
+"""
+
+
+class WireframeFilter(Filter):  # draw polygon edges over the mesh faces in the same pass by using barycentric coordinates of triangle corners
+    def __init__(self, color=Color((0.0, 0.0, 0.0, 1.0)), width=1.0, edge_mask=None):
+        self._color = Color(color)
+        self._width = width
+        self._enabled = True
+        self._edge_mask = edge_mask  # array (triangles, 3), True if the edge opposite to the corner is a polygon edge. None means all edges
+        vfunc = Function(wireframe_vertex_template)
+        ffunc = Function(wireframe_fragment_template)
+        self._bc = VertexBuffer(np.zeros((0, 3), dtype=np.float32))
+        vfunc["bc"] = self._bc
+        Filter.__init__(self, vcode=vfunc, fcode=ffunc, fpos=9)  # after the shading, so edges are not lighted
+
+    def set_data(self, color=None, width=None, edge_mask=None, enabled=None):
+        if enabled is not None:
+            self._enabled = enabled
+        if color is not None:
+            self._color = Color(color)
+        if width is not None:
+            self._width = width
+        if edge_mask is not None:
+            self._edge_mask = edge_mask
+        self._update_data()
+
+    def _update_data(self):
+        if not self.attached:
+            return
+        self.fshader["enabled"] = 1 if self._enabled else 0
+        self.fshader["color"] = self._color.rgba
+        self.fshader["width"] = float(self._width)
+        faces = self._visual.mesh_data.get_faces()
+        triangles_count = 0 if faces is None else len(faces)
+        # the mesh visual draws not indexed triangles, so each triangle corner has own coordinate
+        bc = np.tile(np.eye(3, dtype=np.float32)[None], (triangles_count, 1, 1))
+        if self._edge_mask is not None and len(self._edge_mask) == triangles_count:
+            for corner in range(3):  # the coordinate is 1 in all corners, so the opposite edge is never drawn
+                bc[np.logical_not(self._edge_mask[:, corner]), :, corner] = 1.0
+        self._bc.set_data(bc.reshape((-1, 3)), convert=True)
+        UPLOAD_COUNTER.add(self._bc.nbytes)
+
+    def _on_data_updated(self, event):
+        self._update_data()
+
+    def _attach(self, visual):
+        Filter._attach(self, visual)
+        visual.events.data_updated.connect(self._on_data_updated)
+        self._update_data()
+
+    def _detach(self, visual):
+        visual.events.data_updated.disconnect(self._on_data_updated)
+        Filter._detach(self, visual)
+
+
+class PersistentMeshVisual(MeshVisual):
+    '''Mesh visual, which keeps uploaded buffers of the mesh data. MeshVisual uploads all buffers again after any change of the data or the color,
+    here the uniform color is written to the shader only, and the same mesh data is not uploaded twice. Uploads are counted by UPLOAD_COUNTER.'''
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, c):
+        color = Color(c)
+        md = self.mesh_data
+        if getattr(self, "_data_changed", True) or md.has_vertex_color() or md.has_face_color() or md.has_vertex_value():  # the color is set with buffers
+            MeshVisual.color.fset(self, color)
+        elif not np.array_equal(color.rgba, self._color.rgba):
+            self._color = color
+            self.shared_program.vert[getattr(self, "_color_var", "base_color")] = color.rgba
+            self.update()
+
+    def set_lighting(self, light_dir=None, ambient_color=None, shininess=None):  # light_dir points from the scene to the light, shininess is the inverse exponent of the highlight, 0 means no highlight
+        if self.shading_filter is None:  # the visual without shading, for example edges
+            return
+        if light_dir is not None:
+            self.shading_filter.light_dir = [-v for v in light_dir]  # the filter use the direction of light rays
+        if ambient_color is not None:
+            self.shading_filter.ambient_light = Color(ambient_color).rgb.tolist() + [1.0]
+        if shininess is not None:
+            self.shading_filter.shininess = 1.0 / shininess if shininess > 0.0 else 0.0
+            self.shading_filter.specular_light = (1.0, 1.0, 1.0, 1.0 if shininess > 0.0 else 0.0)
+
+    def set_mesh_data(self, meshdata):  # meshdata is persistent, so the same object is already uploaded
+        if meshdata is not self.mesh_data:
+            self.set_data(meshdata=meshdata)
+
+    def _update_data(self):
+        result = MeshVisual._update_data(self)
+        if result is not False:
+            buffers = [getattr(self, name, None) for name in ("_vertices", "_faces", "_colors")]
+            if self.shading_filter is not None:  # normals are uploaded by the filter, when the data is updated
+                buffers.append(self.shading_filter._normals)
+            for buffer in buffers:
+                if isinstance(buffer, DataBuffer) and buffer.nbytes > 0:
+                    UPLOAD_COUNTER.add(buffer.nbytes)
+        return result
+
+
 NullNode = scene.visuals.create_visual_node(NullVisual)
+PersistentMeshNode = scene.visuals.create_visual_node(PersistentMeshVisual)
 AxisArrowNode = scene.visuals.create_visual_node(AxisArrowVisual)
 GridNode = scene.visuals.create_visual_node(GridVisual)
 
@@ -96,6 +313,7 @@ class SceneVisuals(object):  # collection of visuals on the scene which are not
         self._axis_size = None
         self._axis_shift = None
         self._orientation_mode = 2  # 2 - default, z is upper, 1 - y is upper, 0 - x is upper
+        self._stats_text = None  # lines of render statistics in the corner of the canvas
 
     def set_orientation(self, mode):
         self._orientation_mode = mode
@@ -152,6 +370,24 @@ class SceneVisuals(object):  # collection of visuals on the scene which are not
             self._view_axis._arrow_z.arrow_size = axis_arrow_size
             self._view_axis._arrow_z.arrow_color = axis_z_color
 
+    def add_stats_text(self, parent, color=Color("white"), font_size=9, shift_x=10, shift_y=10, line_step=16):
+        self._stats_shift = (shift_x, shift_y)
+        self._stats_line_step = line_step
+        self._stats_text = scene.visuals.Text(text=[""], pos=[self._stats_shift], parent=parent, color=color, font_size=font_size, anchor_x="left", anchor_y="top")
+
+    def remove_stats_text(self):
+        if self._stats_text is not None:
+            self._stats_text.parent = None
+            self._stats_text = None
+
+    def set_stats_text(self, lines):  # each line is the separate string of the text visual, so line breaks are not needed
+        if self._stats_text is not None and len(lines) > 0:
+            self._stats_text.text = lines
+            self._stats_text.pos = [(self._stats_shift[0], self._stats_shift[1] + i * self._stats_line_step) for i in range(len(lines))]
+
+    def get_draw_calls(self):  # the grid is one line visual, each arrow of the axis is drawn by the line and the head, the text is one visual
+        return (1 if self._is_grid_exist else 0) + (6 if self._view_axis_exist else 0) + (1 if self._stats_text is not None else 0)
+
     def add_grid(self, parent, grid_count=10, grid_step_size=1.0, grid_subdivs=5, grid_center=True, grid_color=[0.7, 0.7, 0.7, 0.5], subgrid_color=[0.7, 0.7, 0.7, 0.25], center_color=[0.9, 0.9, 0.9, 0.75]):
         # save geometry data
         self._grid_geo_parameters.clear()
@@ -0,0 +1,41 @@
+import numpy as np
+
+
+class Bounds(object):
+    '''Axis aligned box of points. It is extended by new points and mapped by transforms without the points,
+    the mapped box is the box of 8 mapped corners. It is exact for transforms, which permute and scale axes.'''
+    def __init__(self, min_corner=None, max_corner=None):
+        self._min = np.array(min_corner, dtype=np.float64) if min_corner is not None else None
+        self._max = np.array(max_corner, dtype=np.float64) if max_corner is not None else None
+
+    def is_empty(self):
+        return self._min is None
+
+    def extend(self, points):  # points is the array (n, 3)
+        if len(points) > 0:
+            self.extend_box(points.min(axis=0), points.max(axis=0))
+
+    def extend_box(self, min_corner, max_corner):
+        if self._min is None:
+            self._min = np.array(min_corner, dtype=np.float64)
+            self._max = np.array(max_corner, dtype=np.float64)
+        else:
+            self._min = np.minimum(self._min, min_corner)
+            self._max = np.maximum(self._max, max_corner)
+
+    def extend_bounds(self, bounds):  # add the other Bounds object
+        if not bounds.is_empty():
+            self.extend_box(bounds._min, bounds._max)
+
+    def get_corners(self):  # return the array (8, 3)
+        box = np.stack((self._min, self._max))
+        return np.array([[box[i][0], box[j][1], box[k][2]] for i in range(2) for j in range(2) for k in range(2)])
+
+    def get_axes(self, transform=None):  # return [(min, max) for each axis] of the box mapped by the vispy transform, zeros for the empty box
+        if self._min is None:
+            return [(0.0, 0.0) for axis in range(3)]
+        if transform is None:
+            return [(float(self._min[i]), float(self._max[i])) for i in range(3)]
+        corners = transform.map(self.get_corners())
+        corners = corners[:, :3] / corners[:, 3:]
+        return [(float(corners[:, i].min()), float(corners[:, i].max())) for i in range(3)]
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+def _expand_bits(values):  # insert two zero bits after each of 10 lower bits
+    values = values.astype(np.uint32)
+    values = (values * np.uint32(0x00010001)) & np.uint32(0xFF0000FF)
+    values = (values * np.uint32(0x00000101)) & np.uint32(0x0F00F00F)
+    values = (values * np.uint32(0x00000011)) & np.uint32(0xC30C30C3)
+    values = (values * np.uint32(0x00000005)) & np.uint32(0x49249249)
+    return values
+
+
+def morton_codes(points):  # return 30-bits Morton codes of points, quantized in the bounding cube. The cube keeps leaves compact for flat meshes
+    min_corner = points.min(axis=0)
+    size = max(float((points.max(axis=0) - min_corner).max()), 1e-30)
+    cells = np.clip(((points - min_corner) / size * 1023.0).astype(np.int64), 0, 1023)
+    return (_expand_bits(cells[:, 0]) << np.uint32(2)) | (_expand_bits(cells[:, 1]) << np.uint32(1)) | _expand_bits(cells[:, 2])
+
+
+def _cross(a, b):  # np.cross for arrays of rows, it is faster for small arrays
+    return np.stack((a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1], a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2], a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]), axis=-1)
+
+
+BVH_START_LEVEL = 6  # the query starts from all nodes of this level
+BVH_LEVEL_STEP = 4  # and tests descendants of hit nodes on the next levels with this step, so there are less iterations with larger arrays
+
+
+class BVH(object):
+    '''Bounding volume hierarchy over triangles for ray picking. Triangles are sorted by Morton codes of centroids
+    and grouped by leaf_size into leaves of the complete binary tree, so the tree is stored as arrays of node bounds for each level.
+    The build and the refit are vectorized, the query tests all nodes of one level at once.'''
+    def __init__(self, positions, faces, leaf_size=8):
+        self._faces = faces
+        self._leaf_size = leaf_size
+        corners = [positions[faces[:, i]] for i in range(3)]
+        self._order = np.argsort(morton_codes((corners[0] + corners[1] + corners[2]) / 3.0), kind="stable")
+        leaves_count = max((len(faces) + leaf_size - 1) // leaf_size, 1)
+        self._depth = int(np.ceil(np.log2(leaves_count))) if leaves_count > 1 else 0
+        # leaves are packed to the left, so only first nodes of each level are not empty
+        self._level_counts = [(leaves_count + (1 << (self._depth - level)) - 1) >> (self._depth - level) for level in range(self._depth + 1)]
+        self._levels = []  # from the root to leaves, the level d is the array (2^d, 2, 3) with min and max corners of nodes
+        self.refit(positions)
+
+    def refit(self, positions):  # recompute node bounds for new positions of the same triangles
+        sorted_faces = self._faces[self._order]
+        corners = [positions[sorted_faces[:, i]] for i in range(3)]
+        triangle_mins = np.minimum(np.minimum(corners[0], corners[1]), corners[2])
+        triangle_maxs = np.maximum(np.maximum(corners[0], corners[1]), corners[2])
+        # the first corner and two edges of each triangle in the order of leaves
+        self._triangle_corners = corners[0]
+        self._triangle_edges_1 = corners[1] - corners[0]
+        self._triangle_edges_2 = corners[2] - corners[0]
+        mins = np.full((1 << self._depth, 3), np.inf, dtype=np.float32)
+        maxs = np.full((1 << self._depth, 3), -np.inf, dtype=np.float32)
+        if len(sorted_faces) > 0:
+            starts = np.arange(0, len(sorted_faces), self._leaf_size)
+            mins[:len(starts)] = np.minimum.reduceat(triangle_mins, starts, axis=0)
+            maxs[:len(starts)] = np.maximum.reduceat(triangle_maxs, starts, axis=0)
+        self._levels = [np.stack((mins, maxs), axis=1)]
+        while len(mins) > 1:
+            mins = mins.reshape((-1, 2, 3)).min(axis=1)
+            maxs = maxs.reshape((-1, 2, 3)).max(axis=1)
+            self._levels.insert(0, np.stack((mins, maxs), axis=1))
+
+    def intersect(self, origin, direction):  # return (triangle index, distance along the direction, barycentric (u, v)) of the closest hit or None
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        # zero components give nan in the slab test, so replace them by very small values
+        inverse = 1.0 / np.where(np.abs(direction) < 1e-30, 1e-30, direction)
+        level = min(BVH_START_LEVEL, self._depth)
+        nodes = np.arange(self._level_counts[level])
+        while True:
+            t = (self._levels[level][nodes] - origin) * inverse
+            t_near = t.min(axis=1).max(axis=1)
+            t_far = t.max(axis=1).min(axis=1)
+            nodes = nodes[(t_near <= t_far) & (t_far >= 0.0)]
+            if len(nodes) == 0:
+                return None
+            if level == self._depth:
+                break
+            step = min(BVH_LEVEL_STEP, self._depth - level)
+            nodes = ((nodes << step)[:, None] + np.arange(1 << step)).ravel()
+            level += step
+            nodes = nodes[nodes < self._level_counts[level]]
+        # Moller-Trumbore test of all triangles in hit leaves
+        triangles = (nodes[:, None] * self._leaf_size + np.arange(self._leaf_size)).ravel()
+        triangles = triangles[triangles < len(self._order)]
+        edge_1 = self._triangle_edges_1[triangles].astype(np.float64)
+        edge_2 = self._triangle_edges_2[triangles].astype(np.float64)
+        p = _cross(direction, edge_2)
+        determinants = np.einsum("ij,ij->i", edge_1, p)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse_determinants = 1.0 / determinants
+            s = origin - self._triangle_corners[triangles]
+            u = np.einsum("ij,ij->i", s, p) * inverse_determinants
+            q = _cross(s, edge_1)
+            v = np.dot(q, direction) * inverse_determinants
+            t = np.einsum("ij,ij->i", edge_2, q) * inverse_determinants
+        is_hit = (np.abs(determinants) > 1e-20) & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t >= 0.0)
+        if not np.any(is_hit):
+            return None
+        hits = np.flatnonzero(is_hit)
+        closest = hits[np.argmin(t[hits])]
+        return (int(self._order[triangles[closest]]), float(t[closest]), (float(u[closest]), float(v[closest])))
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+def _face_quadrics(positions, faces):  # return the array (triangles, 10) with area weighted plane quadrics and the array of triangle areas
+    p0 = positions[faces[:, 0]].astype(np.float64)
+    p1 = positions[faces[:, 1]].astype(np.float64)
+    p2 = positions[faces[:, 2]].astype(np.float64)
+    n = np.cross(p1 - p0, p2 - p0)
+    double_areas = np.linalg.norm(n, axis=1)
+    is_valid = double_areas > 0.0
+    n[is_valid] /= double_areas[is_valid, None]
+    d = -1 * np.einsum("ij,ij->i", n, p0)
+    # the quadric of the plane (n, d) is the symmetric 4x4 matrix, store only 10 different values
+    quadrics = np.stack((n[:, 0] * n[:, 0], n[:, 0] * n[:, 1], n[:, 0] * n[:, 2], n[:, 1] * n[:, 1], n[:, 1] * n[:, 2], n[:, 2] * n[:, 2],
+                         n[:, 0] * d, n[:, 1] * d, n[:, 2] * d, d * d), axis=1)
+    quadrics *= (0.5 * double_areas)[:, None]
+    return (quadrics, 0.5 * double_areas)
+
+
+def _cluster_vertices(positions, min_corner, cell_size):  # return (cluster index of each vertex, clusters count)
+    cells = np.floor((positions - min_corner) / cell_size).astype(np.int64)
+    dimensions = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dimensions[1] + cells[:, 1]) * dimensions[2] + cells[:, 2]
+    (unique_keys, clusters) = np.unique(keys, return_inverse=True)
+    return (clusters.ravel(), len(unique_keys))
+
+
+def _cluster_faces(faces, clusters):  # return faces between clusters without degenerated and repeated triangles
+    new_faces = clusters[faces]
+    is_valid = (new_faces[:, 0] != new_faces[:, 1]) & (new_faces[:, 1] != new_faces[:, 2]) & (new_faces[:, 0] != new_faces[:, 2])
+    new_faces = new_faces[is_valid]
+    if len(new_faces) == 0:
+        return new_faces
+    sorted_faces = np.sort(new_faces, axis=1)
+    order = np.lexsort((sorted_faces[:, 2], sorted_faces[:, 1], sorted_faces[:, 0]))
+    sorted_faces = sorted_faces[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = np.any(sorted_faces[1:] != sorted_faces[:-1], axis=1)
+    return new_faces[np.sort(order[is_first])]
+
+
+def _cluster_positions(positions, clusters, clusters_count, corner_clusters, corner_quadrics, min_corner, cell_size):  # return the position of each cluster, which minimizes the sum of the plane quadrics
+    counts = np.bincount(clusters, minlength=clusters_count).astype(np.float64)
+    averages = np.stack([np.bincount(clusters, weights=positions[:, i], minlength=clusters_count) for i in range(3)], axis=1) / np.maximum(counts, 1.0)[:, None]
+    q = np.stack([np.bincount(corner_clusters, weights=corner_quadrics[:, i], minlength=clusters_count) for i in range(10)], axis=1)
+    a = np.stack((q[:, [0, 1, 2]], q[:, [1, 3, 4]], q[:, [2, 4, 5]]), axis=1)
+    b = -1 * q[:, 6:9]
+    # solve only well conditioned systems, flat and line-like clusters use the average position
+    determinants = np.linalg.det(a)
+    traces = q[:, 0] + q[:, 3] + q[:, 5]
+    is_solvable = determinants > 1e-6 * traces ** 3
+    result = averages.copy()
+    if np.any(is_solvable):
+        solved = np.linalg.solve(a[is_solvable], b[is_solvable][:, :, None])[:, :, 0]
+        # the optimal point can be far from the cluster for almost parallel planes, so keep it only near the cell
+        cells = np.floor((averages[is_solvable] - min_corner) / cell_size)
+        cell_min = min_corner + (cells - 0.5) * cell_size
+        cell_max = min_corner + (cells + 1.5) * cell_size
+        is_inside = np.all((solved >= cell_min) & (solved <= cell_max), axis=1)
+        indexes = np.flatnonzero(is_solvable)[is_inside]
+        result[indexes] = solved[is_inside]
+    return result
+
+
+def decimate_mesh(positions, faces, target_count, normals=None, iterations=4):
+    '''Simplify the triangle mesh by clustering vertices in the uniform grid. The position of each cluster minimizes
+    the sum of quadric errors of adjacent triangle planes. The cell size is adjusted to get about target_count triangles.
+    Return (positions, faces, normals), normals are averaged per cluster or None.'''
+    faces = faces.astype(np.int64)
+    if len(faces) <= target_count or target_count <= 0:
+        return (positions, faces, normals)
+    (face_quadrics, areas) = _face_quadrics(positions, faces)
+    min_corner = positions.min(axis=0).astype(np.float64)
+    # for the uniform surface the number of triangles is about two times of the number of occupied cells
+    cell_size = max(np.sqrt(2.0 * areas.sum() / target_count), 1e-12)
+    for iteration in range(iterations):
+        (clusters, clusters_count) = _cluster_vertices(positions, min_corner, cell_size)
+        new_faces = _cluster_faces(faces, clusters)
+        if len(new_faces) == 0:
+            cell_size *= 0.5
+            continue
+        ratio = len(new_faces) / float(target_count)
+        if 0.8 < ratio < 1.25 or iteration == iterations - 1:
+            break
+        cell_size *= np.sqrt(ratio)
+    corner_clusters = clusters[faces].ravel()
+    corner_quadrics = np.repeat(face_quadrics, 3, axis=0)
+    new_positions = _cluster_positions(positions, clusters, clusters_count, corner_clusters, corner_quadrics, min_corner, cell_size)
+    new_normals = None
+    if normals is not None:
+        new_normals = np.stack([np.bincount(clusters, weights=normals[:, i], minlength=clusters_count) for i in range(3)], axis=1)
+        lengths = np.linalg.norm(new_normals, axis=1)
+        new_normals /= np.where(lengths > 0.0, lengths, 1.0)[:, None]
+        new_normals = new_normals.astype(normals.dtype)
+    # remove clusters, which are not used by faces
+    (used, new_faces) = np.unique(new_faces, return_inverse=True)
+    new_faces = new_faces.reshape((-1, 3))
+    return (new_positions[used].astype(positions.dtype), new_faces, new_normals[used] if new_normals is not None else None)
+
+
+def mesh_edges(faces):  # return unique edges of triangles as the array (edges, 2)
+    faces = faces.astype(np.int64)
+    edges = np.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+    edges.sort(axis=1)
+    keys = np.unique((edges[:, 0] << 32) + edges[:, 1])
+    return np.stack((keys >> 32, keys & 0xFFFFFFFF), axis=1)
@@ -0,0 +1,95 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+
+
+def file_content_hash(file_path, block_size=1 << 20):  # sha1 of the file bytes, so copies of the file have equal hashes regardless of paths and modification times
+    sha = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        block = file.read(block_size)
+        while len(block) > 0:
+            sha.update(block)
+            block = file.read(block_size)
+    return sha.hexdigest()
+
+
+class MeshCache(object):
+    '''On-disk cache of processed mesh arrays. Each entry is a folder with one .npy file per array,
+    so arrays can be memory-mapped without reading. Entries are keyed by the source file path, modification time, size
+    and the data version. When the cache is greater than max_size bytes, least recently used entries are removed.'''
+    def __init__(self, cache_dir, max_size=2 * 1024 * 1024 * 1024, version=1):
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+        self._version = version
+        if not os.path.isdir(self._cache_dir):
+            os.makedirs(self._cache_dir)
+
+    def _get_key(self, file_path, variant=""):
+        stat = os.stat(file_path)
+        key_string = "%s|%d|%d|%s|%s" % (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, self._version, variant)
+        return hashlib.sha1(key_string.encode("utf-8")).hexdigest()
+
+    def get(self, file_path, variant=""):
+        '''Return the tuple of memory-mapped arrays (None for arrays which were None) or None if there is no actual entry for the file.'''
+        entry_path = os.path.join(self._cache_dir, self._get_key(file_path, variant))
+        if not os.path.isdir(entry_path):
+            return None
+        try:
+            with open(os.path.join(entry_path, "count"), "r") as file:
+                count = int(file.read())
+            to_return = []
+            for i in range(count):
+                array_path = os.path.join(entry_path, "%d.npy" % i)
+                to_return.append(np.load(array_path, mmap_mode="r") if os.path.isfile(array_path) else None)
+        except (OSError, ValueError):
+            return None
+        os.utime(entry_path, None)  # mark entry as recently used
+        return tuple(to_return)
+
+    def put(self, file_path, arrays, variant=""):
+        key = self._get_key(file_path, variant)
+        entry_path = os.path.join(self._cache_dir, key)
+        if os.path.isdir(entry_path):
+            return
+        # write to the temporary folder and then rename it, so readers never see incomplete entry
+        temp_path = os.path.join(self._cache_dir, "%s.%d.tmp" % (key, os.getpid()))
+        try:
+            os.makedirs(temp_path)
+            for i in range(len(arrays)):
+                if arrays[i] is not None:
+                    np.save(os.path.join(temp_path, "%d.npy" % i), np.ascontiguousarray(arrays[i]))
+            with open(os.path.join(temp_path, "count"), "w") as file:
+                file.write(str(len(arrays)))
+            os.rename(temp_path, entry_path)
+        except OSError as error:
+            print("Fail to write mesh cache: " + str(error))
+            shutil.rmtree(temp_path, ignore_errors=True)
+            return
+        self._evict()
+
+    def _get_entry_size(self, entry_path):
+        return sum(os.path.getsize(os.path.join(entry_path, f)) for f in os.listdir(entry_path))
+
+    def _evict(self):
+        entries = []  # in the form (last_use_time, size, path)
+        total_size = 0
+        for name in os.listdir(self._cache_dir):
+            entry_path = os.path.join(self._cache_dir, name)
+            if os.path.isdir(entry_path) and not name.endswith(".tmp"):
+                try:
+                    size = self._get_entry_size(entry_path)
+                    entries.append((os.path.getmtime(entry_path), size, entry_path))
+                except OSError:
+                    continue
+                total_size += size
+        entries.sort()
+        # keep at least the last entry, even if it is greater than the limit
+        while total_size > self._max_size and len(entries) > 1:
+            (last_use, size, entry_path) = entries.pop(0)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        for name in os.listdir(self._cache_dir):
+            shutil.rmtree(os.path.join(self._cache_dir, name), ignore_errors=True)
@@ -0,0 +1,75 @@
+import numpy as np
+
+NORMALS_WEIGHTINGS = ("none", "area", "angle")  # the contribution of each triangle to normals of its corners
+CREASE_PAIRS_CHUNK = 1 << 22  # the number of (corner, neighbour corner) pairs compared at once, when the crease angle is used
+
+
+def _normalize(vectors):  # zero vectors are kept
+    return vectors / np.maximum(np.sqrt(np.einsum("ij,ij->i", vectors, vectors)), 1e-30)[:, None]
+
+
+def _corner_weights(positions, faces, weighting):  # return (unit normals of triangles, [weighted normals of the triangle corner i for i in range(3)])
+    p = [positions[faces[:, i]].astype(np.float32) for i in range(3)]
+    cross = np.cross(p[1] - p[0], p[2] - p[0])  # the length is the double area
+    units = _normalize(cross)
+    if weighting == "area":
+        return (units, [cross, cross, cross])
+    if weighting == "angle":  # the angle of the triangle at each corner
+        weights = []
+        for i in range(3):
+            a = _normalize(p[(i + 1) % 3] - p[i])
+            b = _normalize(p[(i + 2) % 3] - p[i])
+            weights.append(units * np.arccos(np.clip(np.einsum("ij,ij->i", a, b), -1.0, 1.0))[:, None])
+        return (units, weights)
+    return (units, [units, units, units])
+
+
+def _sum_by_index(indexes, values, count):  # sum rows of values (n, 3) with equal indexes
+    return np.stack([np.bincount(indexes, weights=values[:, i], minlength=count) for i in range(3)], axis=1)
+
+
+def _crease_sums(corner_ids, units, weights, cos_limit):  # for each triangle corner, sum weights of corners with the same id, which triangles are close enough to the triangle of the corner
+    order = np.argsort(corner_ids, kind="stable")
+    sorted_ids = corner_ids[order]
+    is_start = np.ones(len(order), dtype=bool)
+    is_start[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    group_starts = np.flatnonzero(is_start)
+    group_sizes = np.diff(np.append(group_starts, len(order)))
+    # corners of triangles are stored one after another, so the triangle of the corner is corner // 3
+    sorted_units = units[order // 3]
+    sorted_weights = weights[order]
+    sums = np.empty((len(order), 3), dtype=weights.dtype)
+    # groups of the same size are compared as dense blocks (groups, size, size), chunks keep the number of pairs limited, but at least one group is compared at once
+    for size in np.unique(group_sizes):
+        rows = (group_starts[group_sizes == size][:, None] + np.arange(size)).ravel()
+        step = max(CREASE_PAIRS_CHUNK // (size * size), 1) * size
+        for begin in range(0, len(rows), step):
+            block_rows = rows[begin:begin + step]
+            block_units = sorted_units[block_rows].reshape((-1, size, 3))
+            is_smooth = np.matmul(block_units, block_units.transpose((0, 2, 1))) >= cos_limit
+            sums[block_rows] = np.matmul(is_smooth.astype(weights.dtype), sorted_weights[block_rows].reshape((-1, size, 3))).reshape((-1, 3))
+    to_return = np.empty_like(sums)
+    to_return[order] = sums
+    return to_return
+
+
+def smooth_normals(positions, faces, vertex_ids=None, weighting="area", crease_angle=180.0):
+    '''Return float32 normals of vertices as the sum of weighted normals of triangles around each vertex.
+    vertex_ids is the id of the shared position for each vertex, so vertices with equal ids are smoothed together, by default each vertex is shared.
+    Triangles with normals differ by more than crease_angle degrees from the normal of the triangle of the corner are not added to it.'''
+    faces = faces.astype(np.int64)
+    if vertex_ids is None:
+        vertex_ids = np.arange(len(positions))
+    vertex_ids = np.asarray(vertex_ids, dtype=np.int64)
+    (units, weights) = _corner_weights(positions, faces, weighting)
+    ids_count = int(vertex_ids.max()) + 1 if len(vertex_ids) > 0 else 0  # ids are indexes of positions, so they are used directly as bins
+    if crease_angle >= 180.0:  # all triangles around the id are smoothed, so all vertices with the id have the same normal
+        sums = np.zeros((ids_count, 3))
+        for i in range(3):
+            sums += _sum_by_index(vertex_ids[faces[:, i]], weights[i], ids_count)
+        return _normalize(sums).astype(np.float32)[vertex_ids]
+    # triangle corners are stored one after another, and each of them has own normal
+    corner_weights = np.stack(weights, axis=1).reshape((-1, 3))
+    corner_sums = _crease_sums(vertex_ids[faces.ravel()], units, corner_weights, np.cos(np.radians(crease_angle)))
+    # vertices are used by corners of several triangles, usually of the same polygon
+    return _normalize(_sum_by_index(faces.ravel(), _normalize(corner_sums), len(positions))).astype(np.float32)
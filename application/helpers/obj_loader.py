@@ -1,3 +1,11 @@
+import os
+import re
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
 class OBJLoader:
     def __init__(self, filename, swapyz=False):
         """Loads a Wavefront OBJ file. """
@@ -46,3 +54,351 @@ class OBJLoader:
                     else:
                         norms.append(0)
                 self.faces.append((face, norms, texcoords, material))
+
+
+class LoadCancelled(Exception):  # progress callback can raise it to stop the loading
+    pass
+
+
+COMMENT_PATTERN = re.compile(rb"#[^\n]*")  # from # to the end of the line
+INDENT_PATTERN = re.compile(rb"^[ \t]+", re.MULTILINE)
+
+
+class OBJArrayLoader(object):
+    BLOCK_SIZE = 1 << 22  # read the file by blocks of 4 Mb. Small blocks does not slow down the parsing, but keep the GIL free more often when load in the background thread
+    PARALLEL_MIN_SIZE = 1 << 26  # smaller files are parsed in the current process even if workers are set, because processes start is not free
+
+    def __init__(self, filename, swapyz=False, float_type=np.float32, progress_callback=None, workers=1, block_callback=None):
+        """Loads a Wavefront OBJ file into numpy arrays. """
+        self.vertices = None  # (n, 3) array of float_type
+        self.normals = None  # (n, 3) array of float_type
+        self.texcoords = None  # (n, 2) array of float_type
+        # faces are stored as flat arrays. i-th face use face_sizes[i] values from face_vertices, face_normals and face_texcoords
+        self.face_vertices = None  # int32, 1-based indexes as in the file, relative (negative) indexes are resolved
+        self.face_normals = None  # int32, 0 if the corner has no normal
+        self.face_texcoords = None  # int32, 0 if the corner has no texture coordinate
+        self.face_sizes = None  # int32, the number of vertices in each face
+        self.face_materials = None  # int32, index in the materials list or -1 if material is not defined
+        self.materials = []
+        self._faces = None
+        self._float_type = float_type
+
+        merger = _OBJBlocksMerger(float_type, block_callback)
+        file_size = os.path.getsize(filename)
+        if workers > 1 and file_size >= self.PARALLEL_MIN_SIZE:
+            self._read_parallel(filename, file_size, merger, workers, progress_callback)
+        else:
+            self._read_serial(filename, file_size, merger, progress_callback)
+        merger.finish(self, swapyz)
+        if progress_callback is not None:
+            progress_callback(file_size, file_size)
+
+    def _read_serial(self, filename, file_size, merger, progress_callback):
+        bytes_read = 0
+        with open(filename, "rb") as file:
+            tail = b""
+            while True:
+                block = file.read(self.BLOCK_SIZE)
+                if len(block) == 0:
+                    break
+                bytes_read += len(block)
+                last_line_end = block.rfind(b"\n")
+                if last_line_end == -1:  # the line is longer than block, continue reading
+                    tail = tail + block
+                    continue
+                merger.add(parse_obj_block(tail + block[:last_line_end + 1], self._float_type))
+                tail = block[last_line_end + 1:]
+                if progress_callback is not None:
+                    progress_callback(bytes_read, file_size)
+            if len(tail) > 0:
+                merger.add(parse_obj_block(tail + b"\n", self._float_type))
+
+    def _read_parallel(self, filename, file_size, merger, workers, progress_callback):
+        # split the file to chunks by line ends, parse chunks in the process pool and merge them in the file order
+        chunks = []
+        with open(filename, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = 0
+                while start < file_size:
+                    end = data.find(b"\n", min(start + self.BLOCK_SIZE, file_size) - 1)
+                    end = file_size if end == -1 else end + 1
+                    chunks.append((start, end))
+                    start = end
+        # the loader runs in the background thread of the application, so workers are spawned instead of forked
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(_parse_obj_chunk, filename, chunk[0], chunk[1], self._float_type) for chunk in chunks]
+            try:
+                for i in range(len(chunks)):
+                    merger.add(futures[i].result())
+                    if progress_callback is not None:
+                        progress_callback(chunks[i][1], file_size)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    @property
+    def faces(self):
+        '''Faces in the same form as OBJLoader.faces: a list of (face, norms, texcoords, material). Builded at the first call.'''
+        if self._faces is None:
+            self._faces = []
+            start = 0
+            for i in range(len(self.face_sizes)):
+                end = start + self.face_sizes[i]
+                material = self.materials[self.face_materials[i]] if self.face_materials[i] >= 0 else None
+                self._faces.append((self.face_vertices[start:end].tolist(), self.face_normals[start:end].tolist(), self.face_texcoords[start:end].tolist(), material))
+                start = end
+        return self._faces
+
+
+def _per_line_sum(flags, line_lengths):  # return the sum of flags in each line. flags are values of lines one after another
+    positions = np.flatnonzero(flags)
+    line_ends = np.cumsum(line_lengths)
+    return np.searchsorted(positions, line_ends) - np.searchsorted(positions, line_ends - line_lengths)
+
+
+def _line_tokens(values, line_lengths):  # return the number of whitespace separated tokens in each line
+    is_space = values <= 32
+    token_start = ~is_space
+    token_start[1:] &= is_space[:-1]
+    return _per_line_sum(token_start, line_lengths)
+
+
+def _parse_numbers_slow(data, line_starts, line_lengths, columns, float_type):  # parse first numbers after the keyword line by line as OBJLoader do. Used when the block has not numeric tokens
+    to_return = np.zeros((len(line_starts), columns), dtype=float_type)
+    for i in range(len(line_starts)):
+        values = data[line_starts[i]:line_starts[i] + line_lengths[i]].tobytes().split()[1:columns + 1]
+        to_return[i, :len(values)] = [float(v) for v in values]
+    return to_return
+
+
+def _values_to_columns(values, counts, columns, float_type):  # convert flat values with counts per line to (n, columns) array. Missing values are zeros, extra values are ignored
+    lines_count = len(counts)
+    if len(values) == lines_count * columns and np.all(counts == columns):
+        return values.reshape((lines_count, columns)).astype(float_type, copy=False)
+    to_return = np.zeros((lines_count, columns), dtype=float_type)
+    offsets = np.cumsum(counts) - counts
+    for c in range(columns):
+        mask = counts > c
+        to_return[mask, c] = values[offsets[mask] + c]
+    return to_return
+
+
+def _parse_faces_slow(data, line_starts, line_lengths):  # parse faces line by line as OBJLoader do. Used for blocks with mixed face formats
+    sizes = []
+    face_v = []
+    face_vt = []
+    face_vn = []
+    for i in range(len(line_starts)):
+        values = data[line_starts[i]:line_starts[i] + line_lengths[i]].tobytes().split()
+        sizes.append(len(values) - 1)
+        for v in values[1:]:
+            w = v.split(b'/')
+            face_v.append(int(w[0]))
+            face_vt.append(int(w[1]) if len(w) >= 2 and len(w[1]) > 0 else 0)
+            face_vn.append(int(w[2]) if len(w) >= 3 and len(w[2]) > 0 else 0)
+    return (np.array(sizes, dtype=np.int32), np.array(face_v, dtype=np.int32), np.array(face_vt, dtype=np.int32), np.array(face_vn, dtype=np.int32))
+
+
+def _parse_faces(values, data, line_starts, line_lengths):  # return (sizes, face_v, face_vt, face_vn). values are bytes of face lines with blanked prefixes
+    if len(line_starts) == 0:
+        return (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+    selected_lengths = line_lengths + 1
+    sizes = _line_tokens(values, selected_lengths)
+    is_slash = values == 47
+    slashes = _per_line_sum(is_slash, selected_lengths)
+    is_double = np.zeros(len(values), dtype=bool)
+    is_double[:-1] = is_slash[:-1] & is_slash[1:]
+    double_slashes = _per_line_sum(is_double, selected_lengths)
+    # all corners in the block should be in the same format: v, v/vt, v/vt/vn or v//vn
+    slashes_per_corner = slashes[0] // max(sizes[0], 1)
+    use_double = double_slashes[0] > 0
+    if np.any(slashes != slashes_per_corner * sizes) or np.any(double_slashes != (sizes if use_double else 0)):
+        return _parse_faces_slow(data, line_starts, line_lengths)
+    values[is_slash] = 32
+    columns = slashes_per_corner + 1 - (1 if use_double else 0)
+    try:
+        indexes = np.fromstring(values.tobytes(), dtype=np.int32, sep=" ")
+    except ValueError:  # not numeric tokens
+        return _parse_faces_slow(data, line_starts, line_lengths)
+    if len(indexes) != sizes.sum() * columns:
+        return _parse_faces_slow(data, line_starts, line_lengths)
+    indexes = indexes.reshape((-1, columns))
+    empty = np.zeros(len(indexes), dtype=np.int32)
+    face_v = indexes[:, 0]
+    if use_double:
+        face_vt = empty
+        face_vn = indexes[:, 1]
+    else:
+        face_vt = indexes[:, 1] if columns >= 2 else empty
+        face_vn = indexes[:, 2] if columns >= 3 else empty
+    return (sizes.astype(np.int32), np.ascontiguousarray(face_v), np.ascontiguousarray(face_vt), np.ascontiguousarray(face_vn))
+
+
+def parse_obj_block(block, float_type=np.float32):
+    '''Parse the block of OBJ-file data. The block should contains only whole lines.
+    Return the dictionary with arrays of the block. Relative (negative) face indexes are resolved in the block local numeration,
+    masks of these indexes are also returned, so the caller should shift them by the count of elements in previous blocks.'''
+    # record types are defined by first bytes of lines, so comments and the indent are removed before
+    if b"#" in block:
+        block = COMMENT_PATTERN.sub(b"", block)
+    if INDENT_PATTERN.search(block) is not None:
+        block = INDENT_PATTERN.sub(b"", block)
+    data = np.frombuffer(block, dtype=np.uint8)
+    # find all lines
+    line_ends = np.flatnonzero(data == 10)
+    line_starts = np.empty(len(line_ends), dtype=np.int64)
+    line_starts[0:1] = 0
+    line_starts[1:] = line_ends[:-1] + 1
+    line_lengths = line_ends - line_starts
+    # first symbols of each line define the record type
+    padded = np.concatenate((data, np.full(3, 10, dtype=np.uint8)))
+    c0 = padded[line_starts]
+    c1 = padded[line_starts + 1]
+    c2 = padded[line_starts + 2]
+    c1_space = (c1 == 32) | (c1 == 9)
+    c2_space = (c2 == 32) | (c2 == 9)
+    is_v = (c0 == 118) & c1_space  # "v "
+    is_vn = (c0 == 118) & (c1 == 110) & c2_space  # "vn "
+    is_vt = (c0 == 118) & (c1 == 116) & c2_space  # "vt "
+    is_f = (c0 == 102) & c1_space  # "f "
+    # sort bytes by the record type of it line, record keywords are replaced by spaces
+    line_types = np.zeros(len(line_starts), dtype=np.int8)
+    line_types[is_v] = 1
+    line_types[is_vn] = 2
+    line_types[is_vt] = 3
+    line_types[is_f] = 4
+    byte_types = np.repeat(line_types, line_lengths + 1)
+    work = data.copy()
+    work[line_starts[line_types > 0]] = 32
+    work[line_starts[is_vn | is_vt] + 1] = 32
+    to_return = {}
+    # vertices data
+    for (key, mask, type_index, columns) in (("v", is_v, 1, 3), ("vn", is_vn, 2, 3), ("vt", is_vt, 3, 2)):
+        values = work[byte_types == type_index]
+        counts = _line_tokens(values, line_lengths[mask] + 1)
+        try:
+            numbers = np.fromstring(values.tobytes(), dtype=float_type, sep=" ") if len(values) > 0 else np.zeros(0, dtype=float_type)
+        except ValueError:  # not numeric tokens, for example in the end of the line
+            numbers = None
+        if numbers is not None and len(numbers) == counts.sum():
+            to_return[key] = _values_to_columns(numbers, counts, columns, float_type)
+        else:
+            to_return[key] = _parse_numbers_slow(data, line_starts[mask], line_lengths[mask], columns, float_type)
+    # faces
+    f_lines = np.flatnonzero(is_f)
+    (sizes, face_v, face_vt, face_vn) = _parse_faces(work[byte_types == 4], data, line_starts[is_f], line_lengths[is_f])
+    to_return["face_sizes"] = sizes
+    # resolve relative indexes. -1 is the last element defined before the face line
+    for (key, mask, values) in (("face_v", is_v, face_v), ("face_vt", is_vt, face_vt), ("face_vn", is_vn, face_vn)):
+        relative = values < 0
+        if np.any(relative):
+            before = np.repeat((np.cumsum(mask) - mask)[f_lines], sizes)
+            values = values.copy()
+            values[relative] += (before[relative] + 1).astype(np.int32)
+            to_return[key + "_relative"] = relative
+        else:
+            to_return[key + "_relative"] = None
+        to_return[key] = values
+    # materials. These lines are rare, so process it in the python loop
+    material_lines = []
+    material_names = []
+    for l in np.flatnonzero(c0 == 117):  # "u"
+        values = data[line_starts[l]:line_ends[l]].tobytes().split()
+        if len(values) >= 2 and values[0] in (b"usemtl", b"usemat"):
+            material_lines.append(l)
+            material_names.append(values[1].decode("utf-8", "replace"))
+    # -1 means that the material is the same as at the end of the previous block
+    to_return["face_materials"] = (np.searchsorted(np.array(material_lines, dtype=np.int64), f_lines, side="right") - 1).astype(np.int32)
+    to_return["material_names"] = material_names
+    return to_return
+
+
+def _parse_obj_chunk(filename, start, end, float_type):  # called in the worker process
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            block = data[start:end]
+    if not block.endswith(b"\n"):
+        block = block + b"\n"
+    return parse_obj_block(block, float_type)
+
+
+class GrowingArray(object):  # array with amortized appending. The capacity is doubled when it is not enough
+    def __init__(self, columns, dtype):
+        self._data = np.zeros((1024, columns), dtype=dtype)
+        self._size = 0
+
+    def append(self, values):
+        new_size = self._size + len(values)
+        if new_size > len(self._data):
+            new_data = np.zeros((max(new_size, 2 * len(self._data)), self._data.shape[1]), dtype=self._data.dtype)
+            new_data[:self._size] = self._data[:self._size]
+            self._data = new_data
+        self._data[self._size:new_size] = values
+        self._size = new_size
+
+    @property
+    def data(self):  # the view to the filled part
+        return self._data[:self._size]
+
+
+class _OBJBlocksMerger(object):  # collect parsed blocks in the file order and build the final arrays
+    def __init__(self, float_type, block_callback=None):
+        self._float_type = float_type
+        # if the callback is defined, it called as block_callback(merger, block) after each block with faces
+        # vertices and normals loaded so far are available in the merger.vertices_so_far and merger.normals_so_far
+        self._block_callback = block_callback
+        self.vertices_so_far = GrowingArray(3, float_type) if block_callback is not None else None
+        self.normals_so_far = GrowingArray(3, float_type) if block_callback is not None else None
+        self._blocks = {"v": [], "vn": [], "vt": [], "face_sizes": [], "face_v": [], "face_vt": [], "face_vn": [], "face_materials": []}
+        self._counts = {"v": 0, "vn": 0, "vt": 0}
+        self._materials = []
+        self._material_to_index = {}
+        self._current_material = -1
+
+    def add(self, block):
+        for (face_key, key) in (("face_v", "v"), ("face_vt", "vt"), ("face_vn", "vn")):
+            values = block[face_key]
+            if block[face_key + "_relative"] is not None:
+                values[block[face_key + "_relative"]] += self._counts[key]
+            self._blocks[face_key].append(values)
+        for key in ("v", "vn", "vt"):
+            self._blocks[key].append(block[key])
+            self._counts[key] += len(block[key])
+        self._blocks["face_sizes"].append(block["face_sizes"])
+        # convert block material indexes to the global ones
+        names_map = []
+        for name in block["material_names"]:
+            if name not in self._material_to_index:
+                self._materials.append(name)
+                self._material_to_index[name] = len(self._materials) - 1
+            names_map.append(self._material_to_index[name])
+        names_map.append(self._current_material)  # the last element for -1 index
+        names_map = np.array(names_map, dtype=np.int32)
+        self._blocks["face_materials"].append(names_map[block["face_materials"]])
+        if len(block["material_names"]) > 0:
+            self._current_material = names_map[-2]
+        if self._block_callback is not None:
+            self.vertices_so_far.append(block["v"])
+            self.normals_so_far.append(block["vn"])
+            if len(block["face_sizes"]) > 0:
+                self._block_callback(self, block)
+
+    def _concatenate(self, key, shape, dtype):
+        if len(self._blocks[key]) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.concatenate(self._blocks[key])
+
+    def finish(self, loader, swapyz=False):
+        loader.vertices = self._concatenate("v", (0, 3), self._float_type)
+        loader.normals = self._concatenate("vn", (0, 3), self._float_type)
+        loader.texcoords = self._concatenate("vt", (0, 2), self._float_type)
+        if swapyz:
+            loader.vertices = loader.vertices[:, [0, 2, 1]]
+            loader.normals = loader.normals[:, [0, 2, 1]]
+        loader.face_sizes = self._concatenate("face_sizes", (0, ), np.int32)
+        loader.face_vertices = self._concatenate("face_v", (0, ), np.int32)
+        loader.face_texcoords = self._concatenate("face_vt", (0, ), np.int32)
+        loader.face_normals = self._concatenate("face_vn", (0, ), np.int32)
+        loader.face_materials = self._concatenate("face_materials", (0, ), np.int32)
+        loader.materials = self._materials
@@ -1,19 +1,24 @@
 import os
 import xml.etree.cElementTree as ET
-from parameters.parameters_main import ParametersSet
-from helpers.gui_classes import StylesClass
+from parameters.parameters_values import ParametersValues
+try:  # the headless render reads parameters without widgets, so Qt is not needed there
+    from parameters.parameters_main import ParametersSet
+    from helpers.gui_classes import StylesClass
+except ImportError:
+    ParametersSet = None
+    StylesClass = None
 
 
 def get_data_path(data_filename=None):
     if data_filename is not None:
-        return os.path.split(__file__)[0] + "\\..\\data\\" + data_filename
+        return os.path.join(os.path.split(__file__)[0], "..", "data", data_filename)
     else:
         return None
 
 
 def get_image_path(data_filename=None):
     if data_filename is not None:
-        return os.path.split(__file__)[0] + "\\..\\data\\images\\" + data_filename
+        return os.path.join(os.path.split(__file__)[0], "..", "data", "images", data_filename)
     else:
         return None
 
@@ -63,12 +68,13 @@ def read_render_settings_from_file(file_path, host_widget):
         root = tree.getroot()
         set_name = root.attrib["name"] if "name" in root.attrib.keys() else "Render Settings"
         label_width = int(root.attrib["label_width"]) if "label_width" in root.attrib.keys() else 92
-    params = ParametersSet(host=host_widget, name=set_name, label_width=label_width)
+    params = ParametersSet(host=host_widget, name=set_name, label_width=label_width) if host_widget is not None else ParametersValues(name=set_name)
     params.add_group("show_items", "Show Items")
     params.add_group("polygons_settings", "Polygons Settings")
     params.add_group("edges_settings", "Edges Settings")
     params.add_group("points_settings", "Points Settings")
     params.add_group("light", "Light")
+    params.add_group("interaction", "Interaction")
     # read parameters
     show_faces = get_value_from_data(parameters, "show_faces", ["value"], [True])
     show_edges = get_value_from_data(parameters, "show_edges", ["value"], [False])
@@ -86,6 +92,9 @@ def read_render_settings_from_file(file_path, host_widget):
 
     point_size = get_value_from_data(parameters, "point_size", ["value", "min_limit", "max_visible"], [5.0, 0.0, 10.0])
     line_width = get_value_from_data(parameters, "line_width", ["value", "min_limit", "max_visible"], [1, 1, 4])
+    shader_wireframe = get_value_from_data(parameters, "shader_wireframe", ["value"], [False])
+    reduce_quality = get_value_from_data(parameters, "reduce_quality", ["value"], [True])
+    restore_delay = get_value_from_data(parameters, "restore_delay", ["value", "min_limit", "max_visible"], [300, 0, 1000])
     shiness = get_value_from_data(parameters, "shiness", ["value", "min_limit", "max_visible"], [0.005, 0.0, 0.1])
 
     # set parameters to widgets
@@ -98,6 +107,7 @@ def read_render_settings_from_file(file_path, host_widget):
 
     params.add_parameter(group="edges_settings", name="edge_color", visual_name="Color", value=eval(edge_color[0]), type="color")
     params.add_parameter(group="edges_settings", name="line_width", visual_name="Width", value=eval(line_width[0]), type="integer", min_limit=eval(line_width[1]), max_visible=eval(line_width[2]))
+    params.add_parameter(group="edges_settings", name="shader_wireframe", visual_name="Shader Wireframe", value=eval(shader_wireframe[0]), type="boolean")
     params.add_parameter(group="points_settings", name="point_color", visual_name="Color", value=eval(point_color[0]), type="color")
     params.add_parameter(group="points_settings", name="point_size", visual_name="Point Size", value=eval(point_size[0]), type="float", min_limit=eval(point_size[1]), max_visible=eval(point_size[2]))
 
@@ -107,7 +117,10 @@ def read_render_settings_from_file(file_path, host_widget):
     params.add_parameter(group="light", name="light_shift_x", visual_name="Horizontal Shift", value=eval(light_shift_x[0]), type="float", min_visible=eval(light_shift_x[1]), max_visible=eval(light_shift_x[2]))
     params.add_parameter(group="light", name="light_shift_y", visual_name="Vertical Shift", value=eval(light_shift_y[0]), type="float", min_visible=eval(light_shift_y[1]), max_visible=eval(light_shift_y[2]))
 
-    if file_exist is False:
+    params.add_parameter(group="interaction", name="reduce_quality", visual_name="Reduce Quality", value=eval(reduce_quality[0]), type="boolean")
+    params.add_parameter(group="interaction", name="restore_delay", visual_name="Restore Delay", value=eval(restore_delay[0]), type="integer", min_limit=eval(restore_delay[1]), max_visible=eval(restore_delay[2]))
+
+    if file_exist is False and host_widget is not None:  # the file is written by widgets of parameters
         params.save_xml(file_path)
     return params
 
@@ -124,7 +137,7 @@ def read_scene_properties_from_file(file_path, host_widget):
         root = tree.getroot()
         set_name = root.attrib["name"] if "name" in root.attrib.keys() else "Scene Properties"
         label_width = int(root.attrib["label_width"]) if "label_width" in root.attrib.keys() else 92
-    prop_params = ParametersSet(host=host_widget, name=set_name, label_width=label_width)
+    prop_params = ParametersSet(host=host_widget, name=set_name, label_width=label_width) if host_widget is not None else ParametersValues(name=set_name)
     prop_params.add_group("scene", "Scene")
     up_axis = get_value_from_data(parameters, "up_axis", ["value", "items", "min_limit", "max_limit"], [2, ["X", "Y", "Z"], 0, 2])
     prop_params.add_parameter(group="scene", name="up_axis", visual_name="Up Axis", value=(eval(up_axis[0]), eval(up_axis[1])), type="combobox", min_limit=eval(up_axis[2]), max_limit=eval(up_axis[3]))
@@ -132,6 +145,18 @@ def read_scene_properties_from_file(file_path, host_widget):
     prop_params.add_parameter(group="scene", name="scale", visual_name="Scale", value=eval(scale[0]), type="float", min_limit=eval(scale[1]), min_visible=eval(scale[2]), max_visible=eval(scale[3]))
     center = get_value_from_data(parameters, "center", ["value"], [True])
     prop_params.add_parameter(group="scene", name="center", visual_name="Centering", value=eval(center[0]), type="boolean")
+    weld_vertices = get_value_from_data(parameters, "weld_vertices", ["value"], [False])
+    prop_params.add_parameter(group="scene", name="weld_vertices", visual_name="Weld Vertices", value=eval(weld_vertices[0]), type="boolean")
+    normals_weighting = get_value_from_data(parameters, "normals_weighting", ["value", "items", "min_limit", "max_limit"], [1, ["None", "Area", "Angle"], 0, 2])
+    prop_params.add_parameter(group="scene", name="normals_weighting", visual_name="Normals Weighting", value=(eval(normals_weighting[0]), eval(normals_weighting[1])), type="combobox", min_limit=eval(normals_weighting[2]), max_limit=eval(normals_weighting[3]))
+    crease_angle = get_value_from_data(parameters, "crease_angle", ["value", "min_limit", "max_limit", "min_visible", "max_visible"], [180.0, 0.0, 180.0, 0.0, 180.0])
+    prop_params.add_parameter(group="scene", name="crease_angle", visual_name="Crease Angle", value=eval(crease_angle[0]), type="float", min_limit=eval(crease_angle[1]), max_limit=eval(crease_angle[2]), min_visible=eval(crease_angle[3]), max_visible=eval(crease_angle[4]))
+    progressive_loading = get_value_from_data(parameters, "progressive_loading", ["value"], [False])
+    prop_params.add_parameter(group="scene", name="progressive_loading", visual_name="Progressive Loading", value=eval(progressive_loading[0]), type="boolean")
+    levels_of_detail = get_value_from_data(parameters, "levels_of_detail", ["value"], [True])
+    prop_params.add_parameter(group="scene", name="levels_of_detail", visual_name="Levels of Detail", value=eval(levels_of_detail[0]), type="boolean")
+    merge_small_meshes = get_value_from_data(parameters, "merge_small_meshes", ["value"], [True])
+    prop_params.add_parameter(group="scene", name="merge_small_meshes", visual_name="Merge Small Meshes", value=eval(merge_small_meshes[0]), type="boolean")
     camera_fov = get_value_from_data(parameters, "camera_fov", ["value", "min_limit", "max_limit", "min_visible", "max_visible"], [60.0, 0.0, 179.99, 30.0, 75.0])
     prop_params.add_parameter(group="scene", name="camera_fov", visual_name="Camera FOV", value=eval(camera_fov[0]), type="float", min_limit=eval(camera_fov[1]), max_limit=eval(camera_fov[2]), min_visible=eval(camera_fov[3]), max_visible=eval(camera_fov[4]))
 
@@ -181,7 +206,7 @@ def read_scene_properties_from_file(file_path, host_widget):
     data_grid_center_color = get_value_from_data(parameters, "grid_center_color", ["value"], [(229, 229, 229, 192)])
     prop_params.add_parameter(group="grid_settings", name="grid_center_color", visual_name="Center Lines Color", value=eval(data_grid_center_color[0]), type="color")
 
-    if file_exist is False:
+    if file_exist is False and host_widget is not None:
         prop_params.save_xml(file_path)
     return prop_params
 
@@ -299,6 +299,8 @@ class KeyController(object):  # controll behaivour of key pressing
         self._commands.append(CommandClass(command_name="show_render_settings", command_label=show_render_settings["label"] if show_render_settings is not None else "Render Settings...", key=show_render_settings["key"] if show_render_settings is not None else KeyClass([keys.Key("r")], [], [])))
         show_style_settings = commands_data["show_style_settings"] if "show_style_settings" in commands_data.keys() else None
         self._commands.append(CommandClass(command_name="show_style_settings", command_label=show_style_settings["label"] if show_style_settings is not None else "Style Settings...", key=show_style_settings["key"] if show_style_settings is not None else KeyClass([keys.Key("v")], [], [])))
+        show_render_stats = commands_data["show_render_stats"] if "show_render_stats" in commands_data.keys() else None
+        self._commands.append(CommandClass(command_name="show_render_stats", command_label=show_render_stats["label"] if show_render_stats is not None else "Render Statistics", key=show_render_stats["key"] if show_render_stats is not None else KeyClass([keys.Key("i")], [keys.CONTROL], [])))
         if file_exist is False:  # save xml with data
             self._save_to_xml(file_path)
 
@@ -64,7 +64,11 @@ class MainWindow(QtGui.QMainWindow):
                              host_press_event=self.keyPressEvent,
                              host_release_event=self.keyReleaseEvent,
                              scene_properties=self.scene_prop_params.get_parameters(),
-                             render_parameters=self.render_settings_params.get_parameters())
+                             render_parameters=self.render_settings_params.get_parameters(),
+                             cache_dir=os.path.join(os.path.expanduser("~"), ".vis_application", "mesh_cache"),
+                             loader_workers=os.cpu_count(),
+                             pick_callback=self.show_pick,
+                             error_callback=self.show_error)
         self.canvas.measure_fps(0.1, self.show_fps)
         self.canvas.create_native()
         self.canvas.native.setParent(self)
@@ -76,6 +80,19 @@ class MainWindow(QtGui.QMainWindow):
         # FPS message in statusbar:
         self.status = self.statusBar()
         self.status.showMessage("...")
+        # loading progress, visible only when a file is loaded
+        self._loading_progress = QtGui.QProgressBar()
+        self._loading_progress.setRange(0, 100)
+        self._loading_progress.setMaximumWidth(200)
+        self._loading_progress.hide()
+        self._loading_cancel = QtGui.QPushButton("Cancel")
+        self._loading_cancel.clicked.connect(self.cancel_loading_command)
+        self._loading_cancel.hide()
+        # the last picked point, the message area is used by FPS
+        self._pick_label = QtGui.QLabel()
+        self.status.addPermanentWidget(self._pick_label)
+        self.status.addPermanentWidget(self._loading_progress)
+        self.status.addPermanentWidget(self._loading_cancel)
 
         # add file menus
         file_menu = self.menuBar().addMenu("File")
@@ -115,6 +132,14 @@ class MainWindow(QtGui.QMainWindow):
             style_settings_action.setShortcut(style_key.get_key_string())
             style_settings_action.setStatusTip("Open style settings window")
             style_settings_action.triggered.connect(self.style_settings_command)
+        # show render statistics over the scene
+        stats_key = self._key_controller.get_command_key("show_render_stats")
+        if stats_key is not None:
+            render_stats_action = view_menu.addAction(self._key_controller.get_command_label("show_render_stats"))
+            render_stats_action.setShortcut(stats_key.get_key_string())
+            render_stats_action.setCheckable(True)
+            render_stats_action.setStatusTip("Show frame times, draw calls, triangles and uploads over the scene")
+            render_stats_action.toggled.connect(self.canvas.show_render_stats)
         # alow edit layout
         self._edit_layout = False
         layout_key = self._key_controller.get_command_key("edit_layout")
@@ -168,7 +193,26 @@ class MainWindow(QtGui.QMainWindow):
             return self._edit_layout_text[:6] + self._edit_layout_text[14:]
 
     def show_fps(self, fps):
-        self.status.showMessage("FPS: %.2f" % (fps, ))
+        (visible_chunks, chunks_count, triangles) = self.canvas.get_visible_stats()
+        if chunks_count > 1:
+            self.status.showMessage("FPS: %.2f, visible chunks: %d/%d, triangles: %d, draw calls: %d" % (fps, visible_chunks, chunks_count, triangles, self.canvas.get_draw_calls()))
+        else:
+            self.status.showMessage("FPS: %.2f, triangles: %d, draw calls: %d" % (fps, triangles, self.canvas.get_draw_calls()))
+
+    def show_error(self, message):
+        msg = QtGui.QMessageBox()
+        msg.setIcon(QtGui.QMessageBox.Warning)
+        msg.setText(message)
+        msg.exec_()
+
+    def show_pick(self, result):
+        if result is not None:
+            (object_index, triangle, vertex, edge, position) = result
+            self._pick_label.setText("%s: triangle %d, vertex %d, edge (%d, %d), position (%.4f, %.4f, %.4f)" % (os.path.basename(self.canvas.get_object_file_path(object_index)), triangle, vertex, edge[0], edge[1], position[0], position[1], position[2]))
+        elif not self.canvas.is_picking_ready():
+            self._pick_label.setText("Picking structures are still being built, try again later")
+        else:
+            self._pick_label.setText("")
 
     def keyPressEvent(self, event, pressed_keys=None, from_canvas=False):
         # print("Host event: " + str(pressed_keys) + " from canvas: " + str(from_canvas))
@@ -333,11 +377,28 @@ class MainWindow(QtGui.QMainWindow):
 
     def open_command(self):
         self.canvas.clear_keys()
-        file_path = QtGui.QFileDialog.getOpenFileName(self, "Open file...", self._last_open_dir, "Obj file (*.obj)")
-        if len(file_path) > 0:
+        file_paths = QtGui.QFileDialog.getOpenFileNames(self, "Open files...", self._last_open_dir, "Obj file (*.obj)")
+        # the first file replaces the scene and others are added to it, so parts of the assembly can be opened together
+        for i in range(len(file_paths)):
+            file_path = file_paths[i]
             self._last_open_dir = os.path.split(file_path)[0]
             if os.path.isfile(file_path):
-                self.canvas.add_mesh_from_file(file_path)
+                self._loading_progress.setValue(0)
+                self._loading_progress.show()
+                self._loading_cancel.show()
+                self.canvas.add_mesh_from_file(file_path, asynchronous=True, progress_callback=self.loading_progress, finished_callback=self.loading_finished, is_append=i > 0)
+
+    def loading_progress(self, bytes_read, total_bytes):
+        if total_bytes > 0:
+            self._loading_progress.setValue(int(100 * bytes_read / total_bytes))
+
+    def loading_finished(self, is_loaded):
+        if not self.canvas.is_loading():
+            self._loading_progress.hide()
+            self._loading_cancel.hide()
+
+    def cancel_loading_command(self):
+        self.canvas.cancel_loading()
 
     def close_command(self):
         # with message box
@@ -0,0 +1,35 @@
+class ParametersValues(object):
+    '''Values of the parameters set without widgets, for the application without the window.
+    It reads the same data as ParametersSet and returns parameters in the same form, so Canvas gets the same values.'''
+    def __init__(self, name=""):
+        self._name = name
+        self._parameters = []  # each parameter is a tripple: (name, value, type_str)
+        self._name_to_index = {}
+
+    def add_group(self, group_name="", group_label=""):  # groups are used only for widgets
+        pass
+
+    def add_parameter(self, group=None, name=None, visual_name="", value=None, type=None, min_limit=None, max_limit=None, min_visible=None, max_visible=None):
+        if name is not None and name not in self._name_to_index.keys():
+            self._parameters.append((name, value, type))
+            self._name_to_index[name] = len(self._parameters) - 1
+
+    def get_value(self, param_name):
+        if param_name in self._name_to_index.keys():
+            return self._parameters[self._name_to_index[param_name]][1]
+        else:
+            return None
+
+    def get_type(self, param_name):
+        if param_name in self._name_to_index.keys():
+            return self._parameters[self._name_to_index[param_name]][2]
+        else:
+            return None
+
+    def set_value(self, param_name, value):  # change the value without the callback, it is used before the parameters are passed to the canvas
+        if param_name in self._name_to_index.keys():
+            index = self._name_to_index[param_name]
+            self._parameters[index] = (param_name, value, self._parameters[index][2])
+
+    def get_parameters(self):
+        return self._parameters
@@ -0,0 +1,157 @@
+# Render PNG thumbnails of a folder tree of OBJ files by several worker processes. Each worker has own offscreen GL context and mesh cache.
+# Images repeat the folder tree in the output folder, manifest.json there keeps load and render times of each file.
+# Finished files are written to the journal at once, so the interrupted run is continued without rendering them again.
+# Usage: python thumbnail_farm.py input_folder output_folder [--workers N] [--size 256x256] [--backend egl|osmesa] [--cache DIR] [--cache-size MB]
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from canvas.canvas_offscreen import ThumbnailRenderer, find_obj_files, OFFSCREEN_BACKENDS
+from thumbnails import parse_size
+
+MANIFEST_NAME = "manifest.json"
+JOURNAL_SUFFIX = ".partial"  # results of the unfinished run, one JSON object per line
+
+_renderer = None  # ThumbnailRenderer of the worker process
+_worker_index = None
+
+
+def _init_worker(counter, size, backend, cache_dir, cache_size):  # called once in each worker process, so the GL context and the cache are created once
+    global _renderer, _worker_index
+    with counter.get_lock():
+        _worker_index = counter.value
+        counter.value += 1
+    # caches are not shared, because entries are written without locks
+    _renderer = ThumbnailRenderer(size=size, backend=backend, cache_dir=os.path.join(cache_dir, "worker_%d" % _worker_index) if cache_dir is not None else None, cache_size=cache_size)
+
+
+def _render_file(file_path, image_path):  # called in the worker process. Return (load seconds, render seconds, error or None, worker index)
+    try:
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        times = _renderer.render(file_path, image_path)
+    except Exception as error:  # the broken file should not stop the worker
+        return (None, None, str(error), _worker_index)
+    if times is None:
+        return (None, None, "the file is not loaded", _worker_index)
+    return (times[0], times[1], None, _worker_index)
+
+
+class FarmManifest(object):
+    '''Results of rendered files keyed by the path relative to the input folder.
+    Each result is appended to the journal when it is received, the journal is merged to the manifest when the run is finished,
+    so after the crash the next run reads both files and renders only files without results.'''
+    def __init__(self, output_dir):
+        self._path = os.path.join(output_dir, MANIFEST_NAME)
+        self._journal_path = self._path + JOURNAL_SUFFIX
+        self._entries = {}
+        if os.path.isfile(self._path):
+            with open(self._path) as file:
+                self._entries = json.load(file)["files"]
+        if os.path.isfile(self._journal_path):
+            with open(self._journal_path) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:  # the last line is not finished by the crash
+                        continue
+                    self._entries[entry["file"]] = entry
+        self._journal = open(self._journal_path, "a")
+
+    def is_done(self, key, file_path, image_path):  # the image exists and the source is not changed after it was rendered
+        entry = self._entries.get(key)
+        if entry is None or entry["error"] is not None or not os.path.isfile(image_path):
+            return False
+        stat = os.stat(file_path)
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def add(self, entry):
+        self._entries[entry["file"]] = entry
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+
+    def close(self):  # keep the journal for the next run
+        self._journal.close()
+
+    def save(self, summary):  # write the manifest and remove the journal
+        self._journal.close()
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"summary": summary, "files": self._entries}, file, indent=1, sort_keys=True)
+        os.replace(temp_path, self._path)  # the previous manifest is valid until the new one is written
+        os.remove(self._journal_path)
+
+
+def run_farm(input_dir, output_dir, workers=1, size=(256, 256), backend=None, cache_dir=None, cache_size=2 * 1024 * 1024 * 1024):  # return the summary dictionary or None, if workers are stopped
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = FarmManifest(output_dir)
+    tasks = []  # (key, file path, image path)
+    skipped = 0
+    for file_path in find_obj_files([input_dir]):
+        key = os.path.relpath(file_path, input_dir).replace(os.sep, "/")
+        image_path = os.path.join(output_dir, os.path.splitext(key)[0] + ".png")
+        if manifest.is_done(key, file_path, image_path):
+            skipped += 1
+        else:
+            tasks.append((key, file_path, image_path))
+    tasks.sort(key=lambda t: os.path.getsize(t[1]), reverse=True)  # large files first, so workers finish at close times
+    print("%d files, %d are already rendered, %d workers" % (len(tasks) + skipped, skipped, workers))
+
+    start = time.perf_counter()
+    (rendered, failed) = (0, 0)
+    context = multiprocessing.get_context("spawn")  # workers do not inherit the state of this process, each of them creates own GL context
+    counter = context.Value("i", 0)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(counter, size, backend, cache_dir, cache_size // workers)) as executor:
+            futures = dict([(executor.submit(_render_file, t[1], t[2]), t) for t in tasks])
+            for future in as_completed(futures):
+                (key, file_path, image_path) = futures[future]
+                (load_time, render_time, error, worker) = future.result()
+                stat = os.stat(file_path)
+                manifest.add({"file": key,
+                              "image": os.path.relpath(image_path, output_dir).replace(os.sep, "/") if error is None else None,
+                              "size": stat.st_size,
+                              "mtime_ns": stat.st_mtime_ns,
+                              "load_time": load_time,
+                              "render_time": render_time,
+                              "worker": worker,
+                              "error": error})
+                if error is None:
+                    rendered += 1
+                    print("[%d/%d] %s: load %.3f s, render %.3f s, worker %d" % (rendered + failed, len(tasks), key, load_time, render_time, worker))
+                else:
+                    failed += 1
+                    print("[%d/%d] Fail to render %s: %s" % (rendered + failed, len(tasks), key, error))
+    except BrokenProcessPool as error:  # the worker is crashed or can not create the context
+        manifest.close()
+        print("Workers are stopped (%s). %d files are rendered, run again to continue" % (error, rendered))
+        return None
+    elapsed = time.perf_counter() - start
+    summary = {"files": len(tasks) + skipped,
+               "rendered": rendered,
+               "failed": failed,
+               "skipped": skipped,
+               "workers": workers,
+               "seconds": elapsed,
+               "files_per_second": (rendered + failed) / elapsed if elapsed > 0.0 else 0.0}
+    manifest.save(summary)
+    print("Rendered %d files, %d failed, %d skipped in %.2f s: %.2f files per second" % (rendered, failed, skipped, elapsed, summary["files_per_second"]))
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render PNG thumbnails of a folder tree of OBJ files by several worker processes")
+    parser.add_argument("input", help="the folder with OBJ files, it is searched recursively")
+    parser.add_argument("output", help="the folder for images and the manifest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="the number of worker processes, by default the number of processors")
+    parser.add_argument("--size", type=parse_size, default=(256, 256), help="the size of images, 256x256 by default")
+    parser.add_argument("--backend", choices=OFFSCREEN_BACKENDS, default=None, help="the offscreen backend, by default the first available")
+    parser.add_argument("--cache", default=None, help="the folder of mesh caches, each worker uses own subfolder")
+    parser.add_argument("--cache-size", type=int, default=2048, help="the size of all caches in megabytes")
+    args = parser.parse_args()
+    summary = run_farm(args.input, args.output, workers=max(args.workers, 1), size=args.size, backend=args.backend, cache_dir=args.cache, cache_size=args.cache_size * 1024 * 1024)
+    sys.exit(2 if summary is None else (0 if summary["failed"] == 0 else 1))
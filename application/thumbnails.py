@@ -0,0 +1,56 @@
+# Render PNG thumbnails of OBJ files without the window. It works without the display, the scene is drawn by the EGL or OSMesa context of vispy.
+# Usage: python thumbnails.py [--size 256x256] [--output DIR] [--backend egl|osmesa] [--show-grid] [--show-axis] [--cache DIR] file_or_folder ...
+import os
+import sys
+import time
+import argparse
+
+from canvas.canvas_offscreen import ThumbnailRenderer, find_obj_files, OFFSCREEN_BACKENDS
+
+
+def parse_size(value):
+    try:
+        (width, height) = [int(v) for v in value.lower().split("x")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("the size should be in the form WIDTHxHEIGHT")
+    return (width, height)
+
+
+def get_thumbnail_path(file_path, output_dir=None):  # the image is near the file, if the folder is not set
+    name = os.path.splitext(os.path.basename(file_path))[0] + ".png"
+    return os.path.join(output_dir if output_dir is not None else os.path.dirname(os.path.abspath(file_path)), name)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render PNG thumbnails of OBJ files without the window")
+    parser.add_argument("paths", nargs="+", help="OBJ files or folders with them")
+    parser.add_argument("--size", type=parse_size, default=(256, 256), help="the size of images, 256x256 by default")
+    parser.add_argument("--output", default=None, help="the folder for images, by default each image is near its file")
+    parser.add_argument("--backend", choices=OFFSCREEN_BACKENDS, default=None, help="the offscreen backend, by default the first available")
+    parser.add_argument("--show-grid", action="store_true")
+    parser.add_argument("--show-axis", action="store_true")
+    parser.add_argument("--cache", default=None, help="the folder of the mesh cache")
+    args = parser.parse_args()
+
+    file_paths = find_obj_files(args.paths)
+    if args.output is not None and not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    try:
+        renderer = ThumbnailRenderer(size=args.size, backend=args.backend, show_grid=args.show_grid, show_axis=args.show_axis, cache_dir=args.cache, loader_workers=os.cpu_count())
+    except RuntimeError as error:
+        print(error)
+        sys.exit(2)
+    start = time.perf_counter()
+    rendered = 0
+    for file_path in file_paths:
+        try:
+            times = renderer.render(file_path, get_thumbnail_path(file_path, args.output))
+        except Exception as error:  # the broken file should not stop other files
+            print("Fail to render %s: %s" % (file_path, error))
+            continue
+        if times is not None:
+            rendered += 1
+            print("%s: load %.3f s, render %.3f s" % (file_path, times[0], times[1]))
+    renderer.close()
+    print("Rendered %d of %d files in %.2f s by %s" % (rendered, len(file_paths), time.perf_counter() - start, renderer.get_backend()))
+    sys.exit(0 if rendered == len(file_paths) else 1)
@@ -0,0 +1,65 @@
+# Build time and ray query time of the picking BVH on generated grid meshes, hits are compared with the brute force test.
+# Usage: python benchmarks/bvh_benchmark.py [triangles_count ...] [--queries N]
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from helpers.bvh import BVH
+
+
+def grid_mesh(triangles_count):  # return (positions, faces) of the wavy grid in the square [0, side]^2
+    side = int(np.ceil(np.sqrt(triangles_count / 2.0)))
+    xs, ys = np.meshgrid(np.arange(side + 1, dtype=np.float32), np.arange(side + 1, dtype=np.float32))
+    positions = np.stack((xs.ravel(), ys.ravel(), np.sin(xs.ravel() * 0.1) * np.cos(ys.ravel() * 0.1)), axis=1)
+    ids = np.arange((side + 1) * (side + 1), dtype=np.uint32).reshape((side + 1, side + 1))
+    a = ids[:-1, :-1].ravel()
+    b = ids[:-1, 1:].ravel()
+    c = ids[1:, 1:].ravel()
+    d = ids[1:, :-1].ravel()
+    faces = np.concatenate((np.stack((a, b, c), axis=1), np.stack((a, c, d), axis=1)))
+    return (positions, faces, side)
+
+
+def brute_force(positions, faces, origin, direction):
+    corners = positions[faces].astype(np.float64)
+    edge_1 = corners[:, 1] - corners[:, 0]
+    edge_2 = corners[:, 2] - corners[:, 0]
+    p = np.cross(direction, edge_2)
+    det = np.einsum("ij,ij->i", edge_1, p)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = origin - corners[:, 0]
+        u = np.einsum("ij,ij->i", s, p) / det
+        q = np.cross(s, edge_1)
+        v = np.dot(q, direction) / det
+        t = np.einsum("ij,ij->i", edge_2, q) / det
+    t[~((u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0))] = np.inf
+    return np.min(t)
+
+
+if __name__ == "__main__":
+    queries = int(sys.argv[sys.argv.index("--queries") + 1]) if "--queries" in sys.argv else 1000
+    sizes = [int(a) for a in sys.argv[1:] if not a.startswith("--") and (sys.argv.index(a) == 1 or sys.argv[sys.argv.index(a) - 1] != "--queries")]
+    if len(sizes) == 0:
+        sizes = [1000000, 10000000]
+    random = np.random.RandomState(0)
+    for count in sizes:
+        (positions, faces, side) = grid_mesh(count)
+        start = time.perf_counter()
+        bvh = BVH(positions, faces)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        bvh.refit(positions)
+        refit_time = time.perf_counter() - start
+        origins = np.stack((random.uniform(0, side, queries), random.uniform(0, side, queries), np.full(queries, 10.0)), axis=1)
+        directions = np.stack((random.uniform(-0.3, 0.3, queries), random.uniform(-0.3, 0.3, queries), -1 * np.ones(queries)), axis=1)
+        start = time.perf_counter()
+        hits = [bvh.intersect(origins[i], directions[i]) for i in range(queries)]
+        query_time = (time.perf_counter() - start) / queries
+        errors = 0
+        for i in range(min(queries, 5)):
+            expected = brute_force(positions, faces, origins[i], directions[i])
+            found = hits[i][1] if hits[i] is not None else np.inf
+            errors += 0 if (np.isinf(expected) and np.isinf(found)) or abs(expected - found) < 1e-4 else 1
+        print("%d triangles: build %.2f s, refit %.2f s, query %.3f ms, %d of %d rays hit, %d mismatches with brute force" % (len(faces), build_time, refit_time, query_time * 1000.0, sum([h is not None for h in hits]), queries, errors))
@@ -0,0 +1,43 @@
+# Reading time and memory of mesh arrays, when the scene has many copies of one OBJ file.
+# Copies are detected by the content, so the file is parsed once and all instances share its arrays.
+# Usage: python benchmarks/instancing_benchmark.py [copies_count] [--side N]
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from canvas.canvas_items import SceneObjects
+
+
+def write_grid(file_path, side):  # the square grid of quads
+    with open(file_path, "w") as file:
+        file.write("".join(["v %d %d 0\n" % (x, y) for y in range(side + 1) for x in range(side + 1)]))
+        for y in range(side):
+            for x in range(side):
+                a = y * (side + 1) + x + 1
+                file.write("f %d %d %d %d\n" % (a, a + 1, a + side + 2, a + side + 1))
+
+
+def measure(file_paths):
+    objects = SceneObjects(build_lods=False)
+    start = time.perf_counter()
+    datas = [objects.read_mesh_data(file_path) for file_path in file_paths]
+    read_time = time.perf_counter() - start
+    all_bytes = sum([sum([a.nbytes for a in d if a is not None]) for d in datas])
+    unique_bytes = sum([sum([a.nbytes for a in d if a is not None]) for d in dict([(id(d), d) for d in datas]).values()])
+    print("%d files: read %.2f s, arrays of all instances %.1f Mb, stored %.1f Mb" % (len(file_paths), read_time, all_bytes / (1024.0 * 1024.0), unique_bytes / (1024.0 * 1024.0)))
+
+
+if __name__ == "__main__":
+    side = int(sys.argv[sys.argv.index("--side") + 1]) if "--side" in sys.argv else 200
+    copies_count = int(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else 20
+    folder = tempfile.mkdtemp()
+    try:
+        write_grid(os.path.join(folder, "part_0.obj"), side)
+        for i in range(1, copies_count):
+            shutil.copy(os.path.join(folder, "part_0.obj"), os.path.join(folder, "part_%d.obj" % i))
+        measure([os.path.join(folder, "part_%d.obj" % i) for i in range(copies_count)])
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,42 @@
+# Compare the peak memory of reading a mesh with compact (float32 and uint16/uint32) and wide (float64 and int64) arrays.
+# Every mode is measured in a separate process, because the peak RSS can not be reset.
+# Usage: python benchmarks/memory_benchmark.py [faces_count]
+import os
+import sys
+import resource
+import tempfile
+import functools
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+sys.path.insert(0, os.path.split(os.path.abspath(__file__))[0])
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # linux returns kilobytes
+
+
+def measure(file_path, mode):
+    import canvas.canvas_items as canvas_items
+    from helpers.obj_loader import OBJArrayLoader
+    if mode == "wide":  # the layout used before, all floats are float64 and all indexes are int64
+        canvas_items.OBJArrayLoader = functools.partial(OBJArrayLoader, float_type=np.float64)
+        canvas_items.SceneObjects._compact_indexes = lambda self, indexes, vertices_count: indexes.astype(np.int64)
+    start_rss = peak_rss_mb()
+    mesh = canvas_items.SceneObjects()._read_obj(file_path)
+    arrays_mb = sum(a.nbytes for a in mesh if a is not None) / (1024.0 * 1024.0)
+    print("%s: positions %s, faces %s, arrays %.1f Mb, peak RSS %.1f Mb (%.1f Mb before reading)" % (mode, mesh[0].dtype, mesh[1].dtype, arrays_mb, peak_rss_mb(), start_rss))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        from obj_loader_benchmark import write_grid_obj
+        faces_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "grid.obj")
+            print("Reference mesh: %d faces, %.1f Mb" % (write_grid_obj(file_path, faces_count), os.path.getsize(file_path) / (1024.0 * 1024.0)))
+            for mode in ("wide", "compact"):
+                subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", file_path, mode], check=True)
@@ -0,0 +1,57 @@
+# Draw calls and frame time of the scene with many small parts, when each part has own visuals and when parts are merged into shared buffers.
+# It needs the window backend of vispy, frames are drawn without the buffers swap.
+# Usage: python benchmarks/merge_benchmark.py [parts_count] [--frames N]
+import os
+import sys
+import time
+import numpy as np
+from vispy import app, gloo, scene
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from canvas.canvas_items import SceneObjects
+from helpers.decimation import mesh_edges
+
+
+def part_mesh(index, side=16):  # return (positions, poly_faces, edge_faces, normals) of the small wavy grid, parts are placed on the square grid
+    xs, ys = np.meshgrid(np.arange(side + 1, dtype=np.float32), np.arange(side + 1, dtype=np.float32))
+    positions = np.stack((xs.ravel(), ys.ravel(), np.sin(xs.ravel() * 0.5 + index) * 0.5), axis=1)
+    positions += np.array([(index % 32) * (side + 2), (index // 32) * (side + 2), 0.0], dtype=np.float32)
+    ids = np.arange((side + 1) * (side + 1), dtype=np.uint16).reshape((side + 1, side + 1))
+    a = ids[:-1, :-1].ravel()
+    b = ids[:-1, 1:].ravel()
+    c = ids[1:, 1:].ravel()
+    d = ids[1:, :-1].ravel()
+    faces = np.concatenate((np.stack((a, b, c), axis=1), np.stack((a, c, d), axis=1)))
+    return (positions, faces, mesh_edges(faces).astype(np.uint16), None)
+
+
+def measure(parts_count, frames, is_merge):
+    canvas = scene.SceneCanvas(size=(800, 600), show=True)
+    view = canvas.central_widget.add_view()
+    view.camera = scene.cameras.TurntableCamera(fov=60.0)
+    objects = SceneObjects(parent_view=view, build_lods=False, merge_small_meshes=is_merge)
+    start = time.perf_counter()
+    for i in range(parts_count):
+        objects.set_mesh_data("part_%d" % i, part_mesh(i), is_append=True)
+    objects.update_scene()
+    setup_time = time.perf_counter() - start
+    bounds = objects.get_all_bounds()
+    view.camera.set_range(x=bounds[0], y=bounds[1], z=bounds[2])
+    canvas.set_current()
+    canvas.on_draw(None)  # compile shaders and upload buffers
+    gloo.finish()
+    start = time.perf_counter()
+    for i in range(frames):
+        canvas.on_draw(None)
+    gloo.finish()
+    frame_time = (time.perf_counter() - start) / frames
+    print("%d parts, %s: draw calls %d, setup %.2f s, frame %.2f ms (%.1f FPS)" % (parts_count, "merged" if is_merge else "separate", objects.get_draw_calls(), setup_time, frame_time * 1000.0, 1.0 / frame_time))
+    canvas.close()
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[sys.argv.index("--frames") + 1]) if "--frames" in sys.argv else 100
+    parts_count = int(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else 500
+    app.use_app()
+    for is_merge in (False, True):
+        measure(parts_count, frames, is_merge)
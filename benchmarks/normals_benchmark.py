@@ -0,0 +1,29 @@
+# Time of smooth normals for generated grid meshes, with each weighting and with the crease angle, compared with normals of vispy MeshData.
+# Usage: python benchmarks/normals_benchmark.py [triangles_count ...]
+import os
+import sys
+import time
+import numpy as np
+from vispy import geometry
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from helpers.normals import smooth_normals, NORMALS_WEIGHTINGS
+from bvh_benchmark import grid_mesh
+
+
+def measure(triangles_count):
+    (positions, faces, side) = grid_mesh(triangles_count)
+    start = time.perf_counter()
+    geometry.MeshData(vertices=positions, faces=faces).get_vertex_normals()
+    print("%d triangles, MeshData: %.3f s" % (len(faces), time.perf_counter() - start))
+    for weighting in NORMALS_WEIGHTINGS:
+        for crease_angle in (180.0, 45.0):
+            start = time.perf_counter()
+            smooth_normals(positions, faces, weighting=weighting, crease_angle=crease_angle)
+            print("    %s weighting, crease %g: %.3f s" % (weighting, crease_angle, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    counts = [int(v) for v in sys.argv[1:]] if len(sys.argv) > 1 else [100000, 1000000]
+    for triangles_count in counts:
+        measure(triangles_count)
@@ -0,0 +1,57 @@
+# Compare OBJLoader and OBJArrayLoader on generated grid meshes.
+# Usage: python benchmarks/obj_loader_benchmark.py [faces_count ...] [--skip-old]
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from helpers.obj_loader import OBJLoader, OBJArrayLoader
+
+
+def write_grid_obj(file_path, faces_count):  # write a triangulated grid with at least faces_count triangles, v/vt/vn faces
+    side = int(np.ceil(np.sqrt(faces_count / 2.0)))
+    xs, ys = np.meshgrid(np.arange(side + 1, dtype=np.float64), np.arange(side + 1, dtype=np.float64))
+    vertices = np.stack((xs.ravel(), ys.ravel(), np.sin(xs.ravel() * 0.1) * np.cos(ys.ravel() * 0.1)), axis=1)
+    ids = np.arange((side + 1) * (side + 1)).reshape((side + 1, side + 1)) + 1
+    a = ids[:-1, :-1].ravel()
+    b = ids[:-1, 1:].ravel()
+    c = ids[1:, 1:].ravel()
+    d = ids[1:, :-1].ravel()
+    triangles = np.concatenate((np.stack((a, b, c), axis=1), np.stack((a, c, d), axis=1)))[:faces_count]
+    with open(file_path, "w") as file:
+        file.write("# generated grid %d faces\n" % len(triangles))
+        np.savetxt(file, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, vertices[:, :2] / side, fmt="vt %.6f %.6f")
+        file.write("vn 0 0 1\n")
+        corners = np.repeat(triangles, 2, axis=1)
+        np.savetxt(file, corners, fmt="f %d/%d/1 %d/%d/1 %d/%d/1")
+    return len(triangles)
+
+
+def measure(loader_class, file_path):
+    start = time.perf_counter()
+    loader = loader_class(file_path)
+    return (time.perf_counter() - start, loader)
+
+
+if __name__ == "__main__":
+    skip_old = "--skip-old" in sys.argv
+    sizes = [int(a) for a in sys.argv[1:] if not a.startswith("--")]
+    if len(sizes) == 0:
+        sizes = [1000000, 5000000, 20000000]
+    temp_dir = tempfile.mkdtemp()
+    for faces_count in sizes:
+        file_path = os.path.join(temp_dir, "grid_%d.obj" % faces_count)
+        write_grid_obj(file_path, faces_count)
+        file_size = os.path.getsize(file_path) / (1024.0 * 1024.0)
+        (new_time, new_loader) = measure(OBJArrayLoader, file_path)
+        message = "%d faces (%.1f Mb): OBJArrayLoader %.2f s" % (faces_count, file_size, new_time)
+        if not skip_old:
+            (old_time, old_loader) = measure(OBJLoader, file_path)
+            is_same = len(old_loader.faces) == len(new_loader.face_sizes) and np.allclose(np.array(old_loader.vertices), new_loader.vertices, atol=1e-5)
+            message += ", OBJLoader %.2f s, speedup x%.1f, same data: %s" % (old_time, old_time / new_time, is_same)
+        print(message)
+        os.remove(file_path)
+    os.rmdir(temp_dir)
@@ -0,0 +1,33 @@
+# Throughput of the parallel OBJArrayLoader against the workers count.
+# Usage: python benchmarks/obj_loader_scaling_benchmark.py [faces_count] [max_workers]
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from helpers.obj_loader import OBJArrayLoader
+from obj_loader_benchmark import write_grid_obj
+
+
+if __name__ == "__main__":
+    faces_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    OBJArrayLoader.PARALLEL_MIN_SIZE = 0
+    temp_dir = tempfile.mkdtemp()
+    file_path = os.path.join(temp_dir, "grid_%d.obj" % faces_count)
+    write_grid_obj(file_path, faces_count)
+    file_size = os.path.getsize(file_path) / (1024.0 * 1024.0)
+    print("%d faces, %.1f Mb, %d cpu" % (faces_count, file_size, os.cpu_count()))
+    workers = 1
+    base_time = None
+    while workers <= max_workers:
+        start = time.perf_counter()
+        OBJArrayLoader(file_path, workers=workers)
+        load_time = time.perf_counter() - start
+        if base_time is None:
+            base_time = load_time
+        print("workers %2d: %.2f s, %.1f Mb/s, speedup x%.2f" % (workers, load_time, file_size / load_time, base_time / load_time))
+        workers = workers * 2 if workers * 2 <= max_workers or workers == max_workers else max_workers
+    os.remove(file_path)
+    os.rmdir(temp_dir)
@@ -0,0 +1,39 @@
+# Compare the old np.apply_along_axis orientation with the chunked transform_values.
+# Usage: python benchmarks/orientation_benchmark.py [vertices_count ...] [--skip-old]
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.split(os.path.abspath(__file__))[0], "..", "application"))
+from canvas.canvas_items import transform_values
+
+
+def apply_transform(a, tr, shift):  # the old per-vertex function
+    v = a - shift
+    return tr @ v
+
+
+if __name__ == "__main__":
+    skip_old = "--skip-old" in sys.argv
+    sizes = [int(a) for a in sys.argv[1:] if not a.startswith("--")]
+    if len(sizes) == 0:
+        sizes = [1000000, 10000000, 50000000]
+    tr = np.array([[0, 0, 0.5], [0.5, 0, 0], [0, 0.5, 0]])
+    for count in sizes:
+        positions = np.random.rand(count, 3)
+        start = time.perf_counter()
+        shift = np.average(positions, axis=0)
+        average_time = time.perf_counter() - start
+        out = np.empty((count, 3), dtype=np.float32)
+        transform_values(positions, tr, shift, out=out)  # the first call allocates the temporary buffer
+        start = time.perf_counter()
+        transform_values(positions, tr, shift, out=out)
+        new_time = time.perf_counter() - start
+        message = "%d vertices: new %.3f s (+%.3f s for not cached average)" % (count, new_time, average_time)
+        if not skip_old:
+            start = time.perf_counter()
+            old = np.apply_along_axis(apply_transform, 1, positions, tr, np.average(positions, axis=0))
+            old_time = time.perf_counter() - start
+            message += ", old %.3f s, speedup x%.0f, max difference %.2e" % (old_time, old_time / new_time, np.abs(old - out).max())
+        print(message)
@@ -0,0 +1,110 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "application"))
+from helpers.obj_loader import OBJLoader, OBJArrayLoader, parse_obj_block
+
+
+class OBJLoaderTest(unittest.TestCase):
+    '''The array loader should read the same geometry as the line based OBJLoader.'''
+    def setUp(self):
+        self._folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._folder)
+
+    def _write(self, text, name="test.obj"):
+        path = os.path.join(self._folder, name)
+        with open(path, "wb") as file:
+            file.write(text.encode("utf-8"))
+        return path
+
+    def _assert_same(self, path, text=None, block_size=None):  # compare with OBJLoader, text is the file for OBJLoader if it differs
+        if block_size is not None:
+            loader = _small_blocks_loader(block_size)(path)
+        else:
+            loader = OBJArrayLoader(path)
+        reference = OBJLoader(self._write(text, "reference.obj") if text is not None else path)
+        np.testing.assert_allclose(loader.vertices, np.array(reference.vertices, dtype=np.float32).reshape((-1, 3)))
+        np.testing.assert_allclose(loader.normals, np.array(reference.normals, dtype=np.float32).reshape((-1, 3)))
+        np.testing.assert_allclose(loader.texcoords, np.array(reference.texcoords, dtype=np.float32).reshape((-1, 2)))
+        self.assertEqual(loader.faces, reference.faces)
+        return loader
+
+    def test_polygons(self):
+        path = self._write("v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n"
+                           "vt 0 0\nvt 1 0\nvt 1 1\nvt 0 1\n"
+                           "vn 0 0 1\n"
+                           "f 1 2 3\n"
+                           "f 1 2 3 4\n"
+                           "f 1/1 2/2 3/3 4/4\n"
+                           "f 1//1 2//1 3//1\n"
+                           "usemtl red\n"
+                           "f 1/1/1 2/2/1 3/3/1 4/4/1\n"
+                           "f 1 2/2 3//1 4/4/1\n")
+        loader = self._assert_same(path)
+        self.assertEqual(loader.face_sizes.tolist(), [3, 4, 4, 3, 4, 4])
+        self.assertEqual(loader.materials, ["red"])
+
+    def test_comments(self):
+        path = self._write("# header\n"
+                           "v 0 0 0 # first\n"
+                           "v 1 0 0\n"
+                           "v 0 1 0#glued\n"
+                           "vn 0 0 1 # normal\n"
+                           "f 1//1 2//1 3//1 # face\n"
+                           "#f 3 2 1\n")
+        self._assert_same(path, "v 0 0 0\nv 1 0 0\nv 0 1 0\nvn 0 0 1\nf 1//1 2//1 3//1\n")
+
+    def test_leading_whitespace(self):
+        path = self._write("  v 0 0 0\n\tv 1 0 0\n v 0 1 0\n  vt 0.5 0.5\n  f 1/1 2/1 3/1\n\t f 3 2 1\n")
+        loader = self._assert_same(path)
+        self.assertEqual(len(loader.face_sizes), 2)
+
+    def test_crlf(self):
+        text = "v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvn 0 0 1\nf 1/1/1 2/1/1 3/1/1\nf 1 2 3\n"
+        path = self._write(text.replace("\n", "\r\n"))
+        self._assert_same(path, text)
+
+    def test_not_numeric_tokens(self):  # OBJLoader reads only first values, the rest of the line is ignored
+        path = self._write("v 0 0 0 1 red\nv 1 0 0 1 red\nv 0 1 0 1 red\nf 1 2 3\n")
+        self._assert_same(path)
+
+    def test_relative_indexes(self):
+        path = self._write("v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvn 0 0 1\n"
+                           "f -3/-1/-1 -2/-1/-1 -1/-1/-1\n"
+                           "v 1 1 0\n"
+                           "f -4 -3 -1\n")
+        loader = OBJArrayLoader(path)
+        self.assertEqual(loader.face_vertices.tolist(), [1, 2, 3, 1, 2, 4])
+        self.assertEqual(loader.face_texcoords.tolist(), [1, 1, 1, 0, 0, 0])
+        self.assertEqual(loader.face_normals.tolist(), [1, 1, 1, 0, 0, 0])
+
+    def test_relative_indexes_between_blocks(self):
+        lines = ["v %d 0 0\nv %d 1 0\nv %d 0 1\nf -3 -2 -1\n" % (i, i, i) for i in range(50)]
+        path = self._write("".join(lines))
+        loader = _small_blocks_loader(64)(path)
+        self.assertEqual(loader.face_vertices.tolist(), list(range(1, 151)))
+
+    def test_small_blocks(self):
+        path = self._write("# cube\n" + "".join(["  v %d %d %d # corner\r\n" % (i & 1, (i >> 1) & 1, i >> 2) for i in range(8)]) +
+                           "f 1 2 4 3\r\nf 5 6 8 7\r\nf 1 2 6 5\r\nf 3 4 8 7\r\n")
+        loader = self._assert_same(path, block_size=16)
+        self.assertEqual(len(loader.vertices), 8)
+
+    def test_block_without_lines(self):
+        result = parse_obj_block(b"# only comment\n\n   \n")
+        self.assertEqual(len(result["v"]), 0)
+        self.assertEqual(len(result["face_sizes"]), 0)
+
+
+def _small_blocks_loader(block_size):  # the loader which splits files to many blocks
+    return type("SmallBlocksLoader", (OBJArrayLoader, ), {"BLOCK_SIZE": block_size})
+
+
+if __name__ == '__main__':
+    unittest.main()